@@ -7,7 +7,12 @@ This interactive stock screener categorizes stocks based on technical and fundam
 criteria using concepts from Chapter 4.
 """
 
+import heapq
 import time  # Standard library, no external dependencies
+from screening_rules import load_rules
+
+# Scoring thresholds and rating cut-offs (screening_rules.json)
+SCREENING_RULES = load_rules()
 
 # ASCII Art Title (using only basic strings - Chapter 3 concept)
 def display_title():
@@ -103,35 +108,20 @@ def display_menu():
     
     return choice
 
-# Function to display criteria information
+# Function to display criteria information (generated from the rule set)
 def display_criteria():
     display_section("SCREENING CRITERIA INFORMATION")
     
-    print("\033[1;36m[TECHNICAL ANALYSIS]\033[0m")
-    print("  • Price above both MAs (+2 points)")
-    print("  • Price above 50-day MA only (+1 point)")
-    print("  • Price below both MAs (-2 points)")
-    print("  • Golden Cross: 50-day MA above 200-day MA (+1 point)")
-    
-    print("\n\033[1;36m[VALUE ANALYSIS]\033[0m")
-    print("  • P/E Ratio < 15 (+2 points) - Very attractive valuation")
-    print("  • P/E Ratio < 25 (+1 point) - Reasonable valuation")
-    print("  • P/E Ratio > 40 (-1 point) - Expensive valuation")
-    
-    print("\n\033[1;36m[FINANCIAL HEALTH]\033[0m")
-    print("  • Debt/Equity < 0.3 (+2 points) - Very low debt")
-    print("  • Debt/Equity < 0.7 (+1 point) - Moderate debt")
-    print("  • Debt/Equity > 1.5 (-2 points) - High debt burden")
-    
-    print("\n\033[1;36m[INCOME POTENTIAL]\033[0m")
-    print("  • Dividend Yield > 4.0% (+2 points) - High income")
-    print("  • Dividend Yield > 2.0% (+1 point) - Moderate income")
+    sections, ratings = SCREENING_RULES.criteria()
+    for title, lines in sections:
+        print(f"\033[1;36m[{title}]\033[0m")
+        for line in lines:
+            print(f"  • {line}")
+        print()
     
-    print("\n\033[1;36m[OVERALL RATING]\033[0m")
-    print("  • Strong Buy 🔥: Total Score ≥ 5")
-    print("  • Moderate Buy ✅: Total Score ≥ 2")
-    print("  • Hold ⏹️: Total Score ≥ -1")
-    print("  • Sell ❌: Total Score < -1")
+    print("\033[1;36m[OVERALL RATING]\033[0m")
+    for line in ratings:
+        print(f"  • {line}")
     
     input("\n\033[1mPress Enter to return to main menu...\033[0m")
 
@@ -219,6 +209,57 @@ stocks = [
     }
 ]
 
+# Function to score one stock on the screening rules
+def score_stock(stock):
+    return SCREENING_RULES.score(stock)
+
+# Function to build the technical details and explanation shown for a stock
+def explain_stock(stock, rating):
+    current_price = stock["current_price"]
+    ma_50 = stock["ma_50"]
+    ma_200 = stock["ma_200"]
+    
+    # Prepare technical analysis details
+    tech_details = []
+    if current_price > ma_50:
+        tech_details.append(f"  ▲ Price (${current_price}) above 50-day MA (${ma_50})")
+    else:
+        tech_details.append(f"  ▼ Price (${current_price}) below 50-day MA (${ma_50})")
+        
+    if current_price > ma_200:
+        tech_details.append(f"  ▲ Price (${current_price}) above 200-day MA (${ma_200})")
+    else:
+        tech_details.append(f"  ▼ Price (${current_price}) below 200-day MA (${ma_200})")
+    
+    if ma_50 > ma_200:
+        tech_details.append(f"  ✓ Golden Cross: 50-day MA above 200-day MA")
+    else:
+        tech_details.append(f"  ✗ Death Cross: 50-day MA below 200-day MA")
+    
+    # Prepare explanation based on rating
+    if rating == "Strong Buy":
+        explanation = [
+            "This stock shows strong technical and fundamental indicators.",
+            "It has a positive trend and solid financial metrics."
+        ]
+    elif rating == "Moderate Buy":
+        explanation = [
+            "This stock has more positive indicators than negative ones.",
+            "There are some cautions, but overall outlook is positive."
+        ]
+    elif rating == "Hold":
+        explanation = [
+            "This stock shows mixed signals in technical and fundamental analysis.",
+            "There's no clear advantage to buying or selling at current levels."
+        ]
+    else:
+        explanation = [
+            "This stock has multiple negative indicators that suggest caution.",
+            "Technical trends and/or fundamentals are unfavorable."
+        ]
+    
+    return tech_details, explanation
+
 # Main function to analyze stocks
 def analyze_stocks(stock_list):
     # Initialize counters for each rating category
@@ -239,127 +280,37 @@ def analyze_stocks(stock_list):
         display_progress_bar(i+1, len(stock_list), "Analyzing stocks")
         time.sleep(0.25)  # Simulate processing time
         
-        # Extract values for easier reference
-        symbol = stock["symbol"]
-        current_price = stock["current_price"]
-        ma_50 = stock["ma_50"]
-        ma_200 = stock["ma_200"]
-        pe_ratio = stock["pe_ratio"]
-        debt_equity = stock["debt_equity"]
-        dividend_yield = stock["dividend_yield"]
-        sector = stock["sector"]
-        
-        # Initialize scores for different aspects
-        technical_score = 0
-        value_score = 0
-        financial_health_score = 0
-        income_score = 0
-        
-        # Technical analysis
-        if current_price > ma_50 and current_price > ma_200:
-            technical_score += 2  # Price above both moving averages
-        elif current_price > ma_50:
-            technical_score += 1  # Price above 50-day MA but below 200-day MA
-        elif current_price < ma_50 and current_price < ma_200:
-            technical_score -= 2  # Price below both moving averages
-        
-        # Check for golden cross (50-day MA crossing above 200-day MA)
-        if ma_50 > ma_200:
-            technical_score += 1
-        
-        # Value analysis
-        if pe_ratio < 15:
-            value_score += 2  # Very low P/E ratio
-        elif pe_ratio < 25:
-            value_score += 1  # Moderate P/E ratio
-        elif pe_ratio > 40:
-            value_score -= 1  # High P/E ratio
-        
-        # Financial health analysis
-        if debt_equity < 0.3:
-            financial_health_score += 2  # Very low debt
-        elif debt_equity < 0.7:
-            financial_health_score += 1  # Moderate debt
-        elif debt_equity > 1.5:
-            financial_health_score -= 2  # High debt
-        
-        # Income analysis (dividends)
-        if dividend_yield > 4.0:
-            income_score += 2  # High dividend yield
-        elif dividend_yield > 2.0:
-            income_score += 1  # Moderate dividend yield
+        # Apply the technical, value, financial health and income rules
+        scores = score_stock(stock)
+        rating = scores["rating"]
         
-        # Calculate total score
-        total_score = technical_score + value_score + financial_health_score + income_score
-        
-        # Determine rating based on total score
-        if total_score >= 5:
-            rating = "Strong Buy"
+        # Count the rating
+        if rating == "Strong Buy":
             strong_buy_count += 1
-        elif total_score >= 2:
-            rating = "Moderate Buy"
+        elif rating == "Moderate Buy":
             moderate_buy_count += 1
-        elif total_score >= -1:
-            rating = "Hold"
+        elif rating == "Hold":
             hold_count += 1
         else:
-            rating = "Sell"
             sell_count += 1
         
-        # Prepare technical analysis details
-        tech_details = []
-        if current_price > ma_50:
-            tech_details.append(f"  ▲ Price (${current_price}) above 50-day MA (${ma_50})")
-        else:
-            tech_details.append(f"  ▼ Price (${current_price}) below 50-day MA (${ma_50})")
-            
-        if current_price > ma_200:
-            tech_details.append(f"  ▲ Price (${current_price}) above 200-day MA (${ma_200})")
-        else:
-            tech_details.append(f"  ▼ Price (${current_price}) below 200-day MA (${ma_200})")
-        
-        if ma_50 > ma_200:
-            tech_details.append(f"  ✓ Golden Cross: 50-day MA above 200-day MA")
-        else:
-            tech_details.append(f"  ✗ Death Cross: 50-day MA below 200-day MA")
-        
-        # Prepare explanation based on rating
-        if rating == "Strong Buy":
-            explanation = [
-                "This stock shows strong technical and fundamental indicators.",
-                "It has a positive trend and solid financial metrics."
-            ]
-        elif rating == "Moderate Buy":
-            explanation = [
-                "This stock has more positive indicators than negative ones.",
-                "There are some cautions, but overall outlook is positive."
-            ]
-        elif rating == "Hold":
-            explanation = [
-                "This stock shows mixed signals in technical and fundamental analysis.",
-                "There's no clear advantage to buying or selling at current levels."
-            ]
-        else:
-            explanation = [
-                "This stock has multiple negative indicators that suggest caution.",
-                "Technical trends and/or fundamentals are unfavorable."
-            ]
+        tech_details, explanation = explain_stock(stock, rating)
             
         # Store the results for this stock
         results.append({
-            "symbol": symbol,
-            "sector": sector,
-            "current_price": current_price,
+            "symbol": stock["symbol"],
+            "sector": stock["sector"],
+            "current_price": stock["current_price"],
             "rating": rating,
-            "total_score": total_score,
-            "technical_score": technical_score,
-            "value_score": value_score,
-            "financial_score": financial_health_score,
-            "income_score": income_score,
+            "total_score": scores["total_score"],
+            "technical_score": scores["technical_score"],
+            "value_score": scores["value_score"],
+            "financial_score": scores["financial_score"],
+            "income_score": scores["income_score"],
             "tech_details": tech_details,
-            "pe_ratio": pe_ratio,
-            "debt_equity": debt_equity,
-            "dividend_yield": dividend_yield,
+            "pe_ratio": stock["pe_ratio"],
+            "debt_equity": stock["debt_equity"],
+            "dividend_yield": stock["dividend_yield"],
             "explanation": explanation
         })
     
@@ -456,8 +407,26 @@ def display_stock_analysis(stock):
     # Display the rating
     display_rating(rating, stock["explanation"])
 
+# Function to map each sector to the positions of its stocks (built once per screen)
+def build_sector_index(items):
+    sector_index = {}
+    for i, item in enumerate(items):
+        sector_index.setdefault(item["sector"], []).append(i)
+    return sector_index
+
+# Function to find the best results of every sector
+def top_by_sector(results, sector_index=None, top_n=1):
+    if sector_index is None:
+        sector_index = build_sector_index(results)
+    
+    # A heap keeps only the top_n best of each sector (ties keep screening order)
+    return {
+        sector: heapq.nlargest(top_n, (results[i] for i in rows), key=lambda x: x["total_score"])
+        for sector, rows in sector_index.items()
+    }
+
 # Function to display summary results
-def display_summary(counts, results):
+def display_summary(counts, results, top_n=1, sector_index=None):
     display_section("SCREENING SUMMARY")
     
     # Calculate total
@@ -486,26 +455,21 @@ def display_summary(counts, results):
     if total > 0:
         display_section("TOP PERFORMERS BY SECTOR")
         
-        # Get sectors
-        sectors = set(stock["sector"] for stock in results)
-        
-        for sector in sectors:
-            # Filter stocks by sector
-            sector_stocks = [stock for stock in results if stock["sector"] == sector]
-            
-            # Find best stock in sector
-            best_stock = max(sector_stocks, key=lambda x: x["total_score"])
-            
-            # Display best stock in each sector
-            rating_symbol = "🔥" if best_stock["rating"] == "Strong Buy" else "✅" if best_stock["rating"] == "Moderate Buy" else "⏹️" if best_stock["rating"] == "Hold" else "❌"
-            score_color = "\033[1;32m" if best_stock["total_score"] > 0 else "\033[1;31m"
-            
-            print(f"\033[1;35m{sector}:\033[0m {best_stock['symbol']} (${best_stock['current_price']}) - {rating_symbol} {best_stock['rating']} - Score: {score_color}{best_stock['total_score']:+d}\033[0m")
+        for sector, best_stocks in top_by_sector(results, sector_index, top_n).items():
+            for best_stock in best_stocks:
+                # Display the best stocks in each sector
+                rating_symbol = "🔥" if best_stock["rating"] == "Strong Buy" else "✅" if best_stock["rating"] == "Moderate Buy" else "⏹️" if best_stock["rating"] == "Hold" else "❌"
+                score_color = "\033[1;32m" if best_stock["total_score"] > 0 else "\033[1;31m"
+                
+                print(f"\033[1;35m{sector}:\033[0m {best_stock['symbol']} (${best_stock['current_price']}) - {rating_symbol} {best_stock['rating']} - Score: {score_color}{best_stock['total_score']:+d}\033[0m")
 
 # Main program
 def main():
     display_title()
     
+    # Sector -> positions in the stock list, built once
+    stock_sectors = build_sector_index(stocks)
+    
     while True:
         choice = display_menu()
         
@@ -525,7 +489,7 @@ def main():
             display_section("SCREEN BY SECTOR")
             
             # Get unique sectors
-            sectors = sorted(set(stock["sector"] for stock in stocks))
+            sectors = sorted(stock_sectors)
             
             print("Available sectors:")
             for i, sector in enumerate(sectors, 1):
@@ -538,8 +502,8 @@ def main():
             
             selected_sector = sectors[int(sector_choice) - 1]
             
-            # Filter stocks by sector
-            sector_stocks = [stock for stock in stocks if stock["sector"] == selected_sector]
+            # Look up the sector's stocks in the index
+            sector_stocks = [stocks[i] for i in stock_sectors[selected_sector]]
             
             display_section(f"SCREENING {selected_sector.upper()} SECTOR")
             
@@ -0,0 +1,240 @@
+"""
+Incremental Re-Screening
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Keeps a screen up to date while prices tick. Intraday only current_price
+changes; the moving averages, P/E ratio, debt-to-equity and dividend yield
+change at most once a day. The universe is screened once, the points of the
+categories that do not read current_price (value, financial health and
+income with the default rules) are cached per symbol, and a price update
+only re-evaluates the price-dependent categories (technical) and the rating
+of the symbols it touches. Every rating that changes is reported as a
+RatingChange event.
+"""
+
+import copy
+import time
+from collections import namedtuple
+import numpy as np
+from screening_engine import ScreenResult, score_universe
+from screening_rules import CATEGORIES, RATINGS
+
+# A symbol whose rating changed after a price update
+RatingChange = namedtuple("RatingChange", ["symbol", "previous", "rating", "total_score", "price"])
+
+
+class _Rows:
+    """Columns of selected rows of a universe, gathered when a rule reads them"""
+
+    __slots__ = ("universe", "rows")
+
+    def __init__(self, universe, rows):
+        self.universe = universe
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return getattr(self.universe, name)[self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class IncrementalScreener:
+    """A screen of a universe that is updated price tick by price tick"""
+
+    def __init__(self, universe, rules=None):
+        """
+        Args:
+            universe: Universe to screen; it is not modified (the screener
+                      keeps its own copy of the current_price column)
+            rules: RuleSet (the screener's default rules when omitted)
+        """
+        self.universe = copy.copy(universe)
+        self.universe.current_price = universe.current_price.copy()
+        screen = score_universe(self.universe, rules)
+        self.rules = screen.rules
+
+        # Categories whose rules read the price are recomputed on every tick
+        self.live_categories = tuple(key for key in CATEGORIES if "current_price" in self.rules.columns(key))
+        static_categories = [key for key in CATEGORIES if key not in self.live_categories]
+
+        self.scores = {key: getattr(screen, f"{key}_score").copy() for key in CATEGORIES}
+        self.static_score = sum((self.scores[key] for key in static_categories), np.zeros(len(universe), np.int16))
+        self.total_score = screen.total_score.copy()
+        self.rating = screen.rating.copy()
+        self.rows = {symbol: row for row, symbol in enumerate(self.universe.symbols)}
+
+        # Columns the live rules read, for the single-tick path
+        live_columns = set().union(*(self.rules.columns(key) for key in self.live_categories))
+        self._live_columns = [(name, getattr(self.universe, name)) for name in sorted(live_columns)]
+
+    def tick(self, symbol, price):
+        """
+        Apply one price update.
+
+        Args:
+            symbol: Ticker symbol of the universe
+            price: New current price
+
+        Returns:
+            RatingChange if the symbol's rating changed, else None
+
+        Raises:
+            KeyError: For a symbol that is not in the universe
+        """
+        row = self.rows[symbol]
+        self.universe.current_price[row] = price
+
+        stock = {name: column[row] for name, column in self._live_columns}
+        total = int(self.static_score[row])
+        for key in self.live_categories:
+            points = self.rules.score_category(key, stock)
+            self.scores[key][row] = points
+            total += points
+        self.total_score[row] = total
+
+        previous = self.rating[row]
+        rating = RATINGS.index(self.rules.rating(total))
+        if rating == previous:
+            return None
+        self.rating[row] = rating
+        return RatingChange(symbol, RATINGS[previous], RATINGS[rating], total, price)
+
+    def update(self, symbols, prices):
+        """
+        Apply a batch of price updates.
+
+        Args:
+            symbols: Sequence of ticker symbols of the universe
+            prices: New current prices, one per symbol
+
+        Returns:
+            List of RatingChange, one per symbol whose rating changed
+
+        Raises:
+            KeyError: For a symbol that is not in the universe
+        """
+        rows = np.fromiter((self.rows[symbol] for symbol in symbols), dtype=np.intp, count=len(symbols))
+        return self.update_rows(rows, prices)
+
+    def update_rows(self, rows, prices):
+        """
+        Apply a batch of price updates to rows of the universe.
+
+        The columnar path of update(): the live categories of the updated
+        rows are scored with the compiled rules in one go. When a row is
+        updated more than once, its last price wins.
+
+        Args:
+            rows: Integer array of row indexes
+            prices: New current prices, one per row
+
+        Returns:
+            List of RatingChange, one per row whose rating changed
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(rows) > 1:
+            unique, last = np.unique(rows[::-1], return_index=True)
+            if len(unique) < len(rows):
+                rows, prices = unique, prices[::-1][last]
+        self.universe.current_price[rows] = prices
+
+        total = self.static_score[rows]
+        for key, points in self.rules.evaluate(_Rows(self.universe, rows), self.live_categories).items():
+            self.scores[key][rows] = points
+            total = total + points
+        self.total_score[rows] = total
+
+        rating = self.rules.rate(total)
+        previous = self.rating[rows]
+        changed = np.flatnonzero(rating != previous)
+        if not len(changed):
+            return []
+        self.rating[rows[changed]] = rating[changed]
+
+        symbols = self.universe.symbols
+        return [RatingChange(symbols[rows[i]], RATINGS[previous[i]], RATINGS[rating[i]],
+                             int(total[i]), float(prices[i])) for i in changed]
+
+    def screen(self):
+        """
+        The current screen.
+
+        Returns:
+            ScreenResult over a snapshot of the prices and scores (later
+            updates do not change it)
+        """
+        universe = copy.copy(self.universe)
+        universe.current_price = self.universe.current_price.copy()
+        return ScreenResult(universe, self.rules, *(self.scores[key].copy() for key in CATEGORIES))
+
+
+# Benchmark and parity check: random price ticks over a 10k-symbol universe
+if __name__ == "__main__":
+    from screening_engine import Universe
+
+    rng = np.random.default_rng(11)
+    size = 10_000
+    price = np.round(rng.uniform(20, 400, size), 2)
+    universe = Universe(
+        [f"SYM{i:05d}" for i in range(size)],
+        rng.choice(["Technology", "Healthcare", "Financial", "Energy", "Retail", "Utilities"], size),
+        current_price=price,
+        ma_50=np.round(price * rng.uniform(0.97, 1.03, size), 2),
+        ma_200=np.round(price * rng.uniform(0.95, 1.05, size), 2),
+        pe_ratio=np.round(rng.uniform(0, 60, size), 1),
+        debt_equity=np.round(rng.uniform(0, 3, size), 2),
+        dividend_yield=np.round(rng.uniform(0, 8, size), 2)
+    )
+
+    # Ticks move prices around their moving averages, so ratings do change
+    num_ticks = 1_000_000
+    tick_rows = rng.integers(0, size, num_ticks)
+    tick_prices = np.round(price[tick_rows] * rng.uniform(0.95, 1.05, num_ticks), 2)
+    tick_symbols = universe.symbols[tick_rows]
+
+    screener = IncrementalScreener(universe)
+    batch = 1000
+    started = time.perf_counter()
+    events = 0
+    for offset in range(0, num_ticks, batch):
+        events += len(screener.update(tick_symbols[offset:offset + batch], tick_prices[offset:offset + batch]))
+    batch_time = time.perf_counter() - started
+
+    # The end state must equal a full re-screen with the last price of every symbol
+    final_price = price.copy()
+    for row, value in zip(tick_rows.tolist(), tick_prices.tolist()):
+        final_price[row] = value
+    reference_universe = copy.copy(universe)
+    reference_universe.current_price = final_price
+    reference = score_universe(reference_universe)
+    current = screener.screen()
+    assert np.array_equal(current.total_score, reference.total_score)
+    assert np.array_equal(current.rating, reference.rating)
+    assert np.array_equal(screener.universe.current_price, final_price)
+    assert np.array_equal(universe.current_price, price)
+
+    single = IncrementalScreener(universe)
+    count = 200_000
+    symbols, prices = tick_symbols[:count].tolist(), tick_prices[:count].tolist()
+    started = time.perf_counter()
+    single_events = sum(single.tick(symbol, value) is not None for symbol, value in zip(symbols, prices))
+    tick_time = time.perf_counter() - started
+
+    check = IncrementalScreener(universe)
+    check_events = 0
+    for offset in range(0, count, batch):
+        check_events += len(check.update(tick_symbols[offset:offset + batch], tick_prices[offset:offset + batch]))
+    assert np.array_equal(single.total_score, check.total_score) and np.array_equal(single.rating, check.rating)
+
+    started = time.perf_counter()
+    score_universe(universe)
+    full_time = time.perf_counter() - started
+
+    print(f"{size:,} symbols, full screen {full_time * 1000:.2f} ms")
+    print(f"batches of {batch}: {num_ticks / batch_time:,.0f} updates/sec "
+          f"({num_ticks:,} updates, {events:,} rating changes); end state matches a full re-screen")
+    print(f"single ticks: {count / tick_time:,.0f} updates/sec ({single_events:,} rating changes); "
+          f"matches the batch path")
@@ -0,0 +1,138 @@
+"""
+Stock Screener Batch Mode
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Non-interactive entry point for scheduled screens (cron, CI, pipelines):
+
+    python screener.py run --universe universe.csv --out results.parquet
+
+The universe is screened with the columnar engine in one pass, without the
+interactive screener's animations and pauses, and the results are written
+in bulk. The process exits with 0 on success, 1 when the rules, the
+universe or the output cannot be read or written, and 2 for invalid
+arguments. The interactive menu in Stock_Screener_System.py is unchanged.
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from Stock_Screener_System import stocks as SAMPLE_STOCKS
+from screening_engine import Universe, RATINGS, score_universe
+from screening_rules import load_rules
+from universe_loader import load_universe
+
+# Output formats by file extension
+OUTPUT_FORMATS = (".parquet", ".csv", ".json", ".feather")
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+
+
+# Function to write screen results in bulk
+def write_results(frame, path):
+    """
+    Write the results table; the format follows the file extension.
+
+    Args:
+        frame: DataFrame of results
+        path: Output .parquet, .csv, .json or .feather file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        frame.to_parquet(path, index=False)
+    elif extension == ".csv":
+        frame.to_csv(path, index=False)
+    elif extension == ".json":
+        frame.to_json(path, orient="records")
+    elif extension == ".feather":
+        frame.to_feather(path)
+    else:
+        raise ValueError(f"Unsupported output file type: {extension}")
+
+# Function to run one screen from the command line
+def run_screen(args):
+    """
+    Screen a universe and write the results.
+
+    Args:
+        args: Parsed arguments of the "run" command
+
+    Returns:
+        Process exit code
+    """
+    started = time.perf_counter()
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError, ImportError) as e:
+        print(f"screener: cannot load rules: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    try:
+        if args.universe:
+            universe = load_universe(args.universe, args.cache_dir)
+        else:
+            universe = Universe.from_records(SAMPLE_STOCKS)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"screener: cannot load universe: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    screen = score_universe(universe, rules)
+    frame = pd.DataFrame(screen.columns())
+    if args.top:
+        top_rows = list(screen.top_by_sector(args.top).values())
+        frame = frame.iloc[np.concatenate(top_rows)] if top_rows else frame.iloc[:0]
+    if args.sector:
+        frame = frame[frame["sector"].isin(args.sector)]
+    if args.rating:
+        frame = frame[frame["rating"].isin(args.rating)]
+    frame = frame.sort_values(["total_score", "symbol"], ascending=[False, True], kind="stable")
+
+    try:
+        write_results(frame, args.out)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"screener: cannot write results: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if not args.quiet:
+        counts = ", ".join(f"{rating}: {int((frame['rating'] == rating).sum())}" for rating in RATINGS)
+        print(f"Screened {len(universe):,} stocks in {time.perf_counter() - started:.2f}s; "
+              f"wrote {len(frame):,} rows to {args.out} ({counts})")
+    return EXIT_OK
+
+# Function to build the command-line parser
+def build_parser():
+    parser = argparse.ArgumentParser(prog="screener", description="Headless stock screener")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Screen a universe and write the results")
+    run.add_argument("--universe", action="append",
+                     help="Universe file (.csv, .json, .parquet or .feather); repeat to join several "
+                          "files on symbol. Defaults to the built-in sample stocks")
+    run.add_argument("--cache-dir", help="Directory for joined universe snapshots (warm starts skip parsing)")
+    run.add_argument("--out", required=True, help="Output file (.parquet, .csv, .json or .feather)")
+    run.add_argument("--rules", help="Rule set file (.json, or .yaml with PyYAML); "
+                                     "defaults to screening_rules.json")
+    run.add_argument("--sector", action="append", help="Only write this sector (repeatable)")
+    run.add_argument("--rating", action="append", choices=RATINGS, help="Only write this rating (repeatable)")
+    run.add_argument("--top", type=int, help="Only write the N best stocks of each sector")
+    run.add_argument("--quiet", action="store_true", help="Do not print the summary line")
+    run.set_defaults(handler=run_screen)
+    return parser
+
+# Command-line entry point
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if os.path.splitext(args.out)[1].lower() not in OUTPUT_FORMATS:
+        print(f"screener: --out must end in one of {', '.join(OUTPUT_FORMATS)}", file=sys.stderr)
+        return 2
+    if args.top is not None and args.top < 1:
+        print("screener: --top must be at least 1", file=sys.stderr)
+        return 2
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
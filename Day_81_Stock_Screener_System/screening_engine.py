@@ -0,0 +1,444 @@
+"""
+Columnar Screening Engine
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Applies the screener's technical, value, financial health and income rules
+to a whole universe at once. The universe is held as NumPy columns, every
+sub-score is computed from the compiled rule set with vectorized masks
+instead of per-stock if/elif chains, and the explanation text is only built
+for the rows that are actually displayed. With the default rule set the
+scores and ratings are the same as analyze_stocks.
+"""
+
+import time
+import numpy as np
+from Stock_Screener_System import SCREENING_RULES, explain_stock
+from screening_rules import CATEGORIES, NUMERIC_COLUMNS, RATINGS
+
+# Rating names in code order (a result's rating column holds indexes into RATINGS)
+RATING_KEYS = ("strong_buy", "moderate_buy", "hold", "sell")
+
+
+class Universe:
+    """A stock universe stored as columns"""
+
+    __slots__ = ("symbols", "sector_codes", "sector_names", "_sector_rows") + NUMERIC_COLUMNS
+
+    def __init__(self, symbols, sectors, **columns):
+        """
+        Args:
+            symbols: Sequence of ticker symbols
+            sectors: Sequence of sector names, one per symbol
+            **columns: One array per name in NUMERIC_COLUMNS
+        """
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.sector_names, self.sector_codes = np.unique(np.asarray(sectors, dtype=object),
+                                                         return_inverse=True)
+        self.sector_names = self.sector_names.tolist()
+        self._sector_rows = None
+
+        for name in NUMERIC_COLUMNS:
+            values = np.asarray(columns[name], dtype=np.float64)
+            if values.shape != self.symbols.shape:
+                raise ValueError(f"Column {name} has {len(values)} values for {len(self.symbols)} symbols")
+            setattr(self, name, values)
+
+    @classmethod
+    def from_records(cls, stock_list):
+        """
+        Build a universe from the screener's list of stock dictionaries.
+
+        Args:
+            stock_list: List of dictionaries with symbol, sector and the NUMERIC_COLUMNS keys
+
+        Returns:
+            Universe
+        """
+        return cls([stock["symbol"] for stock in stock_list],
+                   [stock["sector"] for stock in stock_list],
+                   **{name: [stock[name] for stock in stock_list] for name in NUMERIC_COLUMNS})
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Build a universe from a pandas DataFrame with the same columns.
+
+        Args:
+            frame: DataFrame with symbol, sector and the NUMERIC_COLUMNS columns
+
+        Returns:
+            Universe
+        """
+        return cls(frame["symbol"].to_numpy(), frame["sector"].to_numpy(),
+                   **{name: frame[name].to_numpy() for name in NUMERIC_COLUMNS})
+
+    @classmethod
+    def from_arrays(cls, symbols, sector_codes, sector_names, **columns):
+        """
+        Build a universe from arrays already in its layout, without copying
+        or re-encoding them (used for memory-mapped snapshots).
+
+        Args:
+            symbols: Array of ticker symbols (object or fixed-width string)
+            sector_codes: Integer array of indexes into sector_names
+            sector_names: Sorted list of sector names
+            **columns: One float64 array per name in NUMERIC_COLUMNS
+
+        Returns:
+            Universe
+        """
+        universe = cls.__new__(cls)
+        universe.symbols = symbols
+        universe.sector_codes = sector_codes
+        universe.sector_names = list(sector_names)
+        universe._sector_rows = None
+        for name in NUMERIC_COLUMNS:
+            if columns[name].shape != symbols.shape:
+                raise ValueError(f"Column {name} has {len(columns[name])} values for {len(symbols)} symbols")
+            setattr(universe, name, columns[name])
+        return universe
+
+    @property
+    def sectors(self):
+        """Sector name of every row"""
+        return np.asarray(self.sector_names, dtype=object)[self.sector_codes]
+
+    def sector_index(self):
+        """
+        Rows of every sector, built on first use with one stable sort of the
+        sector codes and then reused.
+
+        Returns:
+            Dictionary mapping each sector name to an ascending array of row indexes
+        """
+        if self._sector_rows is None:
+            order = np.argsort(self.sector_codes, kind="stable")
+            bounds = np.cumsum(np.bincount(self.sector_codes, minlength=len(self.sector_names)))
+            self._sector_rows = dict(zip(self.sector_names, np.split(order, bounds[:-1])))
+        return self._sector_rows
+
+    def record(self, row):
+        """The row as a stock dictionary, as used by the interactive screener"""
+        stock = {"symbol": self.symbols[row]}
+        for name in NUMERIC_COLUMNS:
+            stock[name] = float(getattr(self, name)[row])
+        stock["sector"] = self.sector_names[self.sector_codes[row]]
+        return stock
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class ScreenResult:
+    """Sub-scores, total score and rating of every row of a universe"""
+
+    __slots__ = ("universe", "rules", "technical_score", "value_score", "financial_score", "income_score",
+                 "total_score", "rating")
+
+    def __init__(self, universe, rules, technical_score, value_score, financial_score, income_score):
+        self.universe = universe
+        self.rules = rules
+        self.technical_score = technical_score
+        self.value_score = value_score
+        self.financial_score = financial_score
+        self.income_score = income_score
+        self.total_score = technical_score + value_score + financial_score + income_score
+        self.rating = rules.rate(self.total_score)
+
+    def counts(self):
+        """Number of stocks per rating, with the keys returned by analyze_stocks"""
+        counts = np.bincount(self.rating, minlength=len(RATINGS))
+        return {key: int(count) for key, count in zip(RATING_KEYS, counts)}
+
+    def result(self, row):
+        """
+        Full result dictionary of one row, in the format of analyze_stocks.
+
+        The technical details and explanation are built here, so only rows
+        that are displayed pay for the text.
+        """
+        stock = self.universe.record(row)
+        rating = RATINGS[self.rating[row]]
+        tech_details, explanation = explain_stock(stock, rating)
+        return {
+            "symbol": stock["symbol"],
+            "sector": stock["sector"],
+            "current_price": stock["current_price"],
+            "rating": rating,
+            "total_score": int(self.total_score[row]),
+            "technical_score": int(self.technical_score[row]),
+            "value_score": int(self.value_score[row]),
+            "financial_score": int(self.financial_score[row]),
+            "income_score": int(self.income_score[row]),
+            "tech_details": tech_details,
+            "pe_ratio": stock["pe_ratio"],
+            "debt_equity": stock["debt_equity"],
+            "dividend_yield": stock["dividend_yield"],
+            "explanation": explanation
+        }
+
+    def columns(self):
+        """
+        The screen as columns (no explanation text), for bulk output.
+
+        Returns:
+            Dictionary of equal-length arrays: symbol, sector, the input
+            metrics, the four sub-scores, total_score and rating (names)
+        """
+        universe = self.universe
+        return {
+            "symbol": universe.symbols,
+            "sector": universe.sectors,
+            **{name: getattr(universe, name) for name in NUMERIC_COLUMNS},
+            "technical_score": self.technical_score,
+            "value_score": self.value_score,
+            "financial_score": self.financial_score,
+            "income_score": self.income_score,
+            "total_score": self.total_score,
+            "rating": np.asarray(RATINGS, dtype=object)[self.rating]
+        }
+
+    def top_by_sector(self, top_n=1, sectors=None):
+        """
+        Best rows of every sector by total score.
+
+        Each sector's rows come from the universe's sector index and its
+        top_n are picked with np.argpartition, so only the selected rows are
+        sorted. Ties keep universe order, like max() over analyze_stocks
+        results.
+
+        Args:
+            top_n: Number of rows per sector
+            sectors: Optional sector names to limit the result to
+
+        Returns:
+            Dictionary mapping each sector to an array of up to top_n row
+            indexes, best first
+        """
+        index = self.universe.sector_index()
+        size = len(self.universe)
+        top = {}
+        for sector in sectors if sectors is not None else index:
+            rows = index[sector]
+            # One integer key per row: the higher the score, then the earlier the row, the larger
+            keys = self.total_score[rows].astype(np.int64) * size - rows
+            if len(rows) > top_n:
+                best = np.argpartition(keys, len(rows) - top_n)[len(rows) - top_n:]
+                rows, keys = rows[best], keys[best]
+            top[sector] = rows[np.argsort(-keys)]
+        return top
+
+    def sector_rows(self, sector):
+        """Rows of one sector, for drill-downs (from the universe's sector index)"""
+        return self.universe.sector_index()[sector]
+
+    def results(self, rows=None):
+        """Result dictionaries for the given rows (every row by default)"""
+        if rows is None:
+            rows = range(len(self.universe))
+        return [self.result(row) for row in rows]
+
+    def __len__(self):
+        return len(self.universe)
+
+
+# Function to screen a whole universe with vectorized rules
+def score_universe(universe, rules=None, masks=None):
+    """
+    Score every stock of a universe with a rule set.
+
+    Each condition is one comparison over a column. The matches of a
+    chain's rules are packed into one byte per row, and a lookup table
+    turns every byte into the points of its first matching rule, so the
+    cost is a few passes over each column regardless of the number of
+    rules that fire.
+
+    Args:
+        universe: Universe to screen
+        rules: RuleSet (the screener's default rules when omitted)
+        masks: Optional condition mask cache shared with other screens of
+               the same universe
+
+    Returns:
+        ScreenResult
+    """
+    rules = rules or SCREENING_RULES
+    scores = rules.evaluate(universe, masks=masks)
+    return ScreenResult(universe, rules, *(scores[key] for key in CATEGORIES))
+
+# Function to screen one universe with many rule sets
+def score_rule_sets(universe, rule_sets):
+    """
+    Score a universe with several rule sets in one pass.
+
+    The rule sets share one condition mask cache, so a comparison that
+    appears in many of them (the moving average rules, common thresholds)
+    is computed once for the whole batch.
+
+    Args:
+        universe: Universe to screen
+        rule_sets: Iterable of RuleSet
+
+    Returns:
+        List of ScreenResult, one per rule set
+    """
+    masks = {}
+    return [score_universe(universe, rules, masks) for rules in rule_sets]
+
+
+# Benchmark and parity check against analyze_stocks' rules on a random universe
+if __name__ == "__main__":
+    import copy
+    import json
+    from Stock_Screener_System import score_stock
+    from screening_rules import DEFAULT_RULES_PATH, RuleSet
+
+    # Frozen copy of the screener's original hard-coded rules; score_stock now
+    # reads screening_rules.json, so this is the independent reference
+    def reference_score(stock):
+        current_price, ma_50, ma_200 = stock["current_price"], stock["ma_50"], stock["ma_200"]
+        pe_ratio, debt_equity, dividend_yield = stock["pe_ratio"], stock["debt_equity"], stock["dividend_yield"]
+
+        technical_score = 0
+        if current_price > ma_50 and current_price > ma_200:
+            technical_score += 2
+        elif current_price > ma_50:
+            technical_score += 1
+        elif current_price < ma_50 and current_price < ma_200:
+            technical_score -= 2
+        if ma_50 > ma_200:
+            technical_score += 1
+
+        value_score = 0
+        if pe_ratio < 15:
+            value_score += 2
+        elif pe_ratio < 25:
+            value_score += 1
+        elif pe_ratio > 40:
+            value_score -= 1
+
+        financial_score = 0
+        if debt_equity < 0.3:
+            financial_score += 2
+        elif debt_equity < 0.7:
+            financial_score += 1
+        elif debt_equity > 1.5:
+            financial_score -= 2
+
+        income_score = 0
+        if dividend_yield > 4.0:
+            income_score += 2
+        elif dividend_yield > 2.0:
+            income_score += 1
+
+        total_score = technical_score + value_score + financial_score + income_score
+        if total_score >= 5:
+            rating = "Strong Buy"
+        elif total_score >= 2:
+            rating = "Moderate Buy"
+        elif total_score >= -1:
+            rating = "Hold"
+        else:
+            rating = "Sell"
+        return {"technical_score": technical_score, "value_score": value_score,
+                "financial_score": financial_score, "income_score": income_score,
+                "total_score": total_score, "rating": rating}
+
+    rng = np.random.default_rng(7)
+    size = 10_000
+    sectors = ["Technology", "Healthcare", "Financial", "Energy", "Retail", "Utilities"]
+
+    # Values are drawn so that many land exactly on the rule thresholds
+    def column(low, high, thresholds):
+        values = np.round(rng.uniform(low, high, size), 2)
+        on_threshold = rng.random(size) < 0.1
+        values[on_threshold] = rng.choice(thresholds, on_threshold.sum())
+        return values
+
+    price = column(20, 400, [100.0])
+    universe = Universe(
+        [f"SYM{i:05d}" for i in range(size)],
+        rng.choice(sectors, size),
+        current_price=price,
+        ma_50=np.where(rng.random(size) < 0.05, price, np.round(price * rng.uniform(0.85, 1.15, size), 2)),
+        ma_200=np.where(rng.random(size) < 0.05, price, np.round(price * rng.uniform(0.75, 1.25, size), 2)),
+        pe_ratio=column(0, 60, [15.0, 25.0, 40.0]),
+        debt_equity=column(0, 3, [0.3, 0.7, 1.5]),
+        dividend_yield=column(0, 8, [2.0, 4.0])
+    )
+    stock_list = [universe.record(row) for row in range(size)]
+
+    runs = []
+    for _ in range(50):
+        started = time.perf_counter()
+        screen = score_universe(universe)
+        runs.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    per_stock = [score_stock(stock) for stock in stock_list]
+    loop_time = time.perf_counter() - started
+
+    expected = [reference_score(stock) for stock in stock_list]
+    for row, scores in enumerate(expected):
+        got = screen.result(row)
+        assert all(got[key] == value for key, value in scores.items()), (row, scores, got)
+        assert per_stock[row] == scores, (row, scores, per_stock[row])
+    print(f"{size:,} symbols: columnar {np.median(runs) * 1000:.2f} ms (median of 50), "
+          f"per-stock rules {loop_time * 1000:.1f} ms; all scores and ratings match the original rules")
+    print(screen.counts())
+
+    # Top 20 per sector against a full sort of every sector's results
+    runs = []
+    for _ in range(20):
+        universe._sector_rows = None  # Time the index build as well
+        started = time.perf_counter()
+        top = screen.top_by_sector(top_n=20)
+        runs.append(time.perf_counter() - started)
+    row_sectors = universe.sectors
+    for sector, rows in top.items():
+        members = np.flatnonzero(row_sectors == sector).tolist()
+        expected_rows = sorted(members, key=lambda row: -expected[row]["total_score"])[:20]
+        assert rows.tolist() == expected_rows, sector
+    print(f"top 20 of each of {len(top)} sectors: {np.median(runs) * 1000:.2f} ms (median of 20, "
+          f"including the sector index); matches a full sort")
+
+    # 50 rule sets: the default rules with thresholds moved by up to +-20%,
+    # on a grid so that variants share some of their conditions
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as handle:
+        default_definition = json.load(handle)
+    definitions = []
+    for index in range(50):
+        definition = copy.deepcopy(default_definition)
+        definition["name"] = f"variant-{index}"
+        for category in definition["categories"][1:]:  # Value, financial and income thresholds
+            for chain in category["chains"]:
+                for rule in chain:
+                    column, op, threshold = rule["when"][0].split()
+                    threshold = float(threshold) * rng.choice([0.8, 0.9, 1.0, 1.1, 1.2])
+                    rule["when"] = [f"{column} {op} {threshold:.4g}"]
+        definitions.append(definition)
+
+    started = time.perf_counter()
+    rule_sets = [RuleSet(definition) for definition in definitions]
+    compile_time = time.perf_counter() - started
+
+    runs = []
+    for _ in range(10):
+        started = time.perf_counter()
+        screens = score_rule_sets(universe, rule_sets)
+        runs.append(time.perf_counter() - started)
+    shared_time = np.median(runs)
+
+    started = time.perf_counter()
+    for rules in rule_sets:
+        score_universe(universe, rules)
+    separate_time = time.perf_counter() - started
+
+    for rules, variant in zip(rule_sets[:5], screens[:5]):
+        for row in range(0, size, 7):
+            got = variant.result(row)
+            assert all(got[key] == value for key, value in rules.score(stock_list[row]).items())
+    print(f"50 rule sets x {size:,} symbols: compile {compile_time * 1000:.2f} ms, "
+          f"shared masks {shared_time * 1000:.1f} ms (median of 10), "
+          f"separately {separate_time * 1000:.1f} ms; variants match the per-stock rules")
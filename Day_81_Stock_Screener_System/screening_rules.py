@@ -0,0 +1,342 @@
+"""
+Screening Rule Sets
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+The screener's scoring rules as data. A rule set (JSON, or YAML when PyYAML
+is installed) lists, for each of the four score categories, one or more
+chains of rules. A chain works like an if/elif statement: the first rule
+whose conditions all hold gives its points. The points of a category's
+chains add up, and the ratings are cut-offs on the total score.
+
+    {"when": ["pe_ratio < 15"], "points": 2, "label": "P/E Ratio < 15"}
+
+Conditions compare a universe column with another column or a number.
+A rule set is parsed and compiled once: every condition becomes a NumPy
+comparison, so a whole universe is scored with a few array passes, and
+conditions shared by several rule sets are only evaluated once. The same
+definition scores single stocks (without NumPy) and produces the criteria
+shown by the interactive screener.
+"""
+
+import json
+import operator
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # Only needed to score whole universes
+    np = None
+
+try:
+    import yaml
+except ImportError:  # YAML rule files are optional; JSON works without it
+    yaml = None
+
+# Default rule set, used by the interactive screener and the columnar engine
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screening_rules.json")
+
+# Columns a condition can refer to
+NUMERIC_COLUMNS = ("current_price", "ma_50", "ma_200", "pe_ratio", "debt_equity", "dividend_yield")
+
+# Score categories, in display order, and the ratings from best to worst
+CATEGORIES = ("technical", "value", "financial", "income")
+RATINGS = ("Strong Buy", "Moderate Buy", "Hold", "Sell")
+
+# Comparison operators: (Python operator, NumPy ufunc name)
+OPERATORS = {
+    "<": (operator.lt, "less"),
+    "<=": (operator.le, "less_equal"),
+    ">": (operator.gt, "greater"),
+    ">=": (operator.ge, "greater_equal"),
+    "==": (operator.eq, "equal"),
+    "!=": (operator.ne, "not_equal"),
+}
+
+CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*$")
+
+# Largest number of rules in a chain (a row's matches are packed into one byte)
+MAX_CHAIN_RULES = 8
+
+
+class Rule:
+    """One rule of a chain: the points given when all conditions hold"""
+
+    __slots__ = ("conditions", "points", "label", "note")
+
+    def __init__(self, conditions, points, label, note=None):
+        self.conditions = conditions  # Tuple of (column, operator, column name or number)
+        self.points = points
+        self.label = label
+        self.note = note
+
+    def matches(self, stock):
+        """Whether a stock dictionary meets every condition"""
+        for column, op, other in self.conditions:
+            value = stock[other] if isinstance(other, str) else other
+            if not OPERATORS[op][0](stock[column], value):
+                return False
+        return True
+
+
+class RuleSet:
+    """A parsed and compiled set of screening rules"""
+
+    def __init__(self, definition):
+        """
+        Args:
+            definition: Dictionary with "categories" (key, title, chains) and
+                        "ratings" (name, symbol, min_score), as in screening_rules.json
+
+        Raises:
+            ValueError: If the definition is invalid
+        """
+        self.name = definition.get("name", "rules")
+        self.titles = {}
+        self.chains = {}  # Category -> list of chains (lists of Rule)
+
+        categories = definition.get("categories")
+        if not isinstance(categories, list):
+            raise ValueError(f"Rule set '{self.name}': 'categories' must be a list")
+        for category in categories:
+            key = category.get("key")
+            if key not in CATEGORIES:
+                raise ValueError(f"Rule set '{self.name}': unknown category '{key}' "
+                                 f"(expected one of {', '.join(CATEGORIES)})")
+            if key in self.chains:
+                raise ValueError(f"Rule set '{self.name}': category '{key}' is defined twice")
+            self.titles[key] = category.get("title", key.upper())
+            self.chains[key] = [[self._parse_rule(key, rule) for rule in chain]
+                                for chain in category.get("chains", [])]
+        for key in CATEGORIES:
+            self.titles.setdefault(key, key.upper())
+            self.chains.setdefault(key, [])
+
+        self.symbols, self.cutoffs = self._parse_ratings(definition.get("ratings"))
+        self._compiled = {key: [self._compile_chain(chain) for chain in self.chains[key] if chain]
+                          for key in CATEGORIES}
+
+    def _parse_rule(self, category, rule):
+        conditions = rule.get("when")
+        if isinstance(conditions, str):
+            conditions = [conditions]
+        if not conditions:
+            raise ValueError(f"Rule set '{self.name}': a {category} rule has no conditions")
+
+        parsed = tuple(self._parse_condition(condition) for condition in conditions)
+        points = rule.get("points")
+        if not isinstance(points, int) or isinstance(points, bool) or not -100 <= points <= 100:
+            raise ValueError(f"Rule set '{self.name}': points must be an integer between -100 and 100")
+        return Rule(parsed, points, rule.get("label", " and ".join(conditions)), rule.get("note"))
+
+    def _parse_condition(self, condition):
+        match = CONDITION_PATTERN.match(str(condition))
+        if not match:
+            raise ValueError(f"Rule set '{self.name}': cannot parse condition '{condition}'")
+        column, op, other = match.groups()
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f"Rule set '{self.name}': unknown column '{column}'")
+        if other not in NUMERIC_COLUMNS:
+            try:
+                other = float(other)
+            except ValueError:
+                raise ValueError(f"Rule set '{self.name}': '{other}' is neither a column nor a number")
+        return column, op, other
+
+    def _compile_chain(self, chain):
+        # A row's matches are packed into a byte (bit i set when rule i
+        # matches); the points of every byte value are looked up in a table
+        # holding the points of its lowest set bit, i.e. the first match
+        if len(chain) > MAX_CHAIN_RULES:
+            raise ValueError(f"Rule set '{self.name}': a chain has more than {MAX_CHAIN_RULES} rules")
+        table = [0] * (1 << len(chain))
+        for matches in range(1, len(table)):
+            table[matches] = chain[(matches & -matches).bit_length() - 1].points
+        chain_key = tuple((rule.conditions, rule.points) for rule in chain)
+        return chain_key, chain, np.array(table, dtype=np.int16) if np is not None else None
+
+    def _parse_ratings(self, ratings):
+        names = tuple(rating.get("name") for rating in ratings or [])
+        if names != RATINGS:
+            raise ValueError(f"Rule set '{self.name}': ratings must be {', '.join(RATINGS)}, in that order")
+        cutoffs = [rating.get("min_score") for rating in ratings[:-1]]
+        if any(not isinstance(cutoff, (int, float)) for cutoff in cutoffs) or \
+                any(higher <= lower for higher, lower in zip(cutoffs, cutoffs[1:])):
+            raise ValueError(f"Rule set '{self.name}': every rating but the last needs a "
+                             f"min_score, in decreasing order")
+        return tuple(rating.get("symbol", "") for rating in ratings), tuple(cutoffs)
+
+    def columns(self, category):
+        """Columns read by the rules of a category"""
+        columns = set()
+        for chain in self.chains[category]:
+            for rule in chain:
+                for column, _, other in rule.conditions:
+                    columns.add(column)
+                    if isinstance(other, str):
+                        columns.add(other)
+        return columns
+
+    # Single stocks (pure Python)
+
+    def score(self, stock):
+        """
+        Score one stock.
+
+        Args:
+            stock: Stock dictionary with the NUMERIC_COLUMNS keys
+
+        Returns:
+            Dictionary with technical_score, value_score, financial_score,
+            income_score, total_score and rating, as returned by score_stock
+        """
+        scores = {f"{key}_score": self.score_category(key, stock) for key in CATEGORIES}
+        total = sum(scores.values())
+        scores["total_score"] = total
+        scores["rating"] = self.rating(total)
+        return scores
+
+    def score_category(self, category, stock):
+        """Points of one category for a stock dictionary"""
+        points = 0
+        for chain in self.chains[category]:
+            for rule in chain:
+                if rule.matches(stock):
+                    points += rule.points
+                    break
+        return points
+
+    def rating(self, total_score):
+        """Rating name of a total score"""
+        for name, cutoff in zip(RATINGS, self.cutoffs):
+            if total_score >= cutoff:
+                return name
+        return RATINGS[-1]
+
+    # Whole universes (NumPy)
+
+    def evaluate(self, universe, categories=CATEGORIES, masks=None):
+        """
+        Score every row of a universe.
+
+        Args:
+            universe: Object with one NumPy array attribute per NUMERIC_COLUMNS name
+            categories: Categories to score
+            masks: Optional dictionary caching condition masks and chain
+                   points; pass the same dictionary to several rule sets to
+                   share their work
+
+        Returns:
+            Dictionary mapping each category to an int16 array of points
+        """
+        if np is None:
+            raise ImportError("numpy is required to score a whole universe")
+        if masks is None:
+            masks = {}
+
+        scores = {}
+        for key in categories:
+            points = np.zeros(len(universe), dtype=np.int16)
+            for chain_key, chain, table in self._compiled[key]:
+                chain_points = masks.get(chain_key)
+                if chain_points is None:
+                    matches = np.zeros(len(universe), dtype=np.uint8)
+                    for bit, rule in enumerate(chain):
+                        matches |= self._rule_mask(universe, rule, masks).view(np.uint8) << np.uint8(bit)
+                    chain_points = masks[chain_key] = table.take(matches)
+                points += chain_points
+            scores[key] = points
+        return scores
+
+    def rate(self, total_score):
+        """
+        Rating codes (indexes into RATINGS) of an array of total scores.
+
+        A row's code is the number of cut-offs its total falls below.
+        """
+        codes = np.zeros(total_score.shape, dtype=np.uint8)
+        for cutoff in self.cutoffs:
+            codes += total_score < cutoff
+        return codes
+
+    def _rule_mask(self, universe, rule, masks):
+        mask = masks.get(rule.conditions)
+        if mask is None:
+            for condition in rule.conditions:
+                condition_mask = masks.get(condition)
+                if condition_mask is None:
+                    column, op, other = condition
+                    right = getattr(universe, other) if isinstance(other, str) else other
+                    condition_mask = masks[condition] = getattr(np, OPERATORS[op][1])(getattr(universe, column), right)
+                mask = condition_mask if mask is None else mask & condition_mask
+            masks[rule.conditions] = mask
+        return mask
+
+    # Display
+
+    def criteria(self):
+        """
+        The rules in display form.
+
+        Returns:
+            (sections, ratings): sections is a list of (title, lines) per
+            category, ratings a list of lines, one per rating
+        """
+        sections = []
+        for key in CATEGORIES:
+            lines = []
+            for chain in self.chains[key]:
+                for rule in chain:
+                    unit = "point" if abs(rule.points) == 1 else "points"
+                    line = f"{rule.label} ({rule.points:+d} {unit})"
+                    lines.append(f"{line} - {rule.note}" if rule.note else line)
+            if lines:
+                sections.append((self.titles[key], lines))
+
+        ratings = [f"{name} {symbol}: Total Score ≥ {cutoff:g}"
+                   for name, symbol, cutoff in zip(RATINGS, self.symbols, self.cutoffs)]
+        ratings.append(f"{RATINGS[-1]} {self.symbols[-1]}: Total Score < {self.cutoffs[-1]:g}")
+        return sections, ratings
+
+
+# Function to read rule set definitions from a JSON or YAML file
+def load_rule_sets(path):
+    """
+    Load and compile the rule sets in a file.
+
+    Args:
+        path: .json, .yaml or .yml file holding one definition or a list of them
+
+    Returns:
+        List of RuleSet
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as handle:
+        if extension in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError("PyYAML is required to load YAML rule files")
+            document = yaml.safe_load(handle)
+        elif extension == ".json":
+            document = json.load(handle)
+        else:
+            raise ValueError(f"Unsupported rule file type: {extension}")
+
+    definitions = document if isinstance(document, list) else [document]
+    return [RuleSet(definition) for definition in definitions]
+
+# Function to load a file holding a single rule set
+def load_rules(path=DEFAULT_RULES_PATH):
+    """
+    Load and compile one rule set.
+
+    Args:
+        path: Rule file (the default rule set when omitted)
+
+    Returns:
+        RuleSet
+    """
+    rule_sets = load_rule_sets(path)
+    if len(rule_sets) != 1:
+        raise ValueError(f"{path} holds {len(rule_sets)} rule sets; expected one")
+    return rule_sets[0]
@@ -7,21 +7,72 @@ This web application implements a moving average crossover strategy backtester
 as covered in Chapter 4, with a modern web interface.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g
 import numpy as np
 import pandas as pd
 import random
 import math
 import json
+import os
+import tempfile
+import threading
+from functools import partial
 import plotly
 import plotly.graph_objs as go
 from datetime import datetime, timedelta
 import plotly.express as px
+from indicators import sma_array, ema_array, IndicatorStore
+from vectorized_backtest import backtest_vectorized
+from event_engine import EventEngine, CrossoverStrategy
+from trade_log import TradeLog
+from costs import CostModel, cost_metrics
+from optimizer import sweep
+from walk_forward import walk_forward
+from monte_carlo import run_monte_carlo
+from data_loader import DATASETS, load_ohlcv, format_dates
+from resampling import TIMEFRAMES, load_resampled
+from downsampling import downsample_indices, DOWNSAMPLE_METHODS
+from compact_format import build_compact_payload
+from result_cache import ResultCache, make_cache_key
+from jobs import JobQueue, QueueFullError
+from profiling import StageTimer, StageMetrics
 
 app = Flask(__name__)
 
+# Available backtest engines
+BACKTEST_ENGINES = ("loop", "vectorized", "event")
+
+# Default point budget per chart line in /api/backtest responses
+DEFAULT_CHART_POINTS = 2000
+
+# Largest simulation accepted by the Monte Carlo endpoint (paths x days)
+MAX_MONTE_CARLO_CELLS = 50_000_000
+
+# Stages a /api/backtest job reports progress after: prices, indicators, simulation, charts
+BACKTEST_JOB_STAGES = 4
+
+# First chart date of simulated prices (fixed, so cached responses do not depend on when they were stored)
+SYNTHETIC_START_DATE = datetime(2000, 1, 1)
+
+# Cache of /api/backtest responses (set BACKTEST_CACHE_DIR to keep them across restarts)
+RESULT_CACHE_BYTES = int(os.environ.get('BACKTEST_CACHE_BYTES', 256 * 1024 * 1024))
+result_cache = ResultCache(RESULT_CACHE_BYTES, os.environ.get('BACKTEST_CACHE_DIR'))
+
+# Recent per-stage latencies of API requests, reported by /metrics
+stage_metrics = StageMetrics()
+
+# Background jobs (POST /api/jobs): SQLite file, concurrent jobs and queue depth
+JOB_DB_PATH = os.environ.get('BACKTEST_JOB_DB', os.path.join(tempfile.gettempdir(), 'backtest_jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('BACKTEST_JOB_WORKERS', 2))
+JOB_QUEUE_DEPTH = int(os.environ.get('BACKTEST_JOB_QUEUE_DEPTH', 32))
+job_queue = None
+job_queue_lock = threading.Lock()
+
+# Memory-mapped files of resampled datasets, one per dataset and timeframe
+RESAMPLE_DIR = os.environ.get('BACKTEST_RESAMPLE_DIR', os.path.join(tempfile.gettempdir(), 'backtest_resampled'))
+
 # Function to generate simulated stock price data
-def generate_price_data(start_price=100, days=100, volatility=0.01, upward_drift=0.0001):
+def generate_price_data(start_price=100, days=100, volatility=0.01, upward_drift=0.0001, seed=None):
     """
     Generate simulated daily stock prices with random walk and slight upward drift.
     
@@ -30,16 +81,20 @@ def generate_price_data(start_price=100, days=100, volatility=0.01, upward_drift
         days: Number of days to simulate
         volatility: Daily price volatility (standard deviation)
         upward_drift: Slight upward bias in price movement
+        seed: Optional seed for a reproducible price series
         
     Returns:
         List of simulated daily prices
     """
+    # Use a private generator when seeded so results don't depend on global state
+    rng = random if seed is None else random.Random(seed)
+    
     prices = [start_price]
     current_price = start_price
     
     for _ in range(days - 1):
         # Random price change with slight upward bias
-        change_percent = random.normalvariate(upward_drift, volatility)
+        change_percent = rng.normalvariate(upward_drift, volatility)
         current_price = current_price * (1 + change_percent)
         # Ensure price doesn't go below 1
         current_price = max(current_price, 1.0)
@@ -47,6 +102,57 @@ def generate_price_data(start_price=100, days=100, volatility=0.01, upward_drift
     
     return prices
 
+# Function to generate many simulated price paths at once
+def generate_price_paths(n_paths, days, start_price=100, volatility=0.01, upward_drift=0.0001,
+                         seed=None, dtype=np.float64, chunk_size=256):
+    """
+    Generate a batch of simulated price paths for Monte Carlo testing.
+    
+    Uses the same random walk as generate_price_data, but draws every shock
+    in one call to a NumPy Generator and compounds them with cumprod.
+    
+    Args:
+        n_paths: Number of price paths to simulate
+        days: Number of days in each path
+        start_price: Initial price of every path
+        volatility: Daily price volatility (standard deviation)
+        upward_drift: Slight upward bias in price movement
+        seed: Optional seed (or np.random.Generator) for reproducible paths
+        dtype: np.float64, or np.float32 to halve memory use
+        chunk_size: Number of paths compounded together
+        
+    Returns:
+        2-D NumPy array of shape (n_paths, days)
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("dtype must be float32 or float64")
+    
+    rng = np.random.default_rng(seed)
+    
+    # Draw all shocks into the output buffer, then turn them into growth factors
+    paths = rng.standard_normal((n_paths, days), dtype=dtype)
+    if days == 0:
+        return paths
+    paths *= volatility
+    paths += 1 + upward_drift
+    paths[:, 0] = start_price
+    
+    for start in range(0, n_paths, chunk_size):
+        chunk = paths[start:start + chunk_size]
+        factors = chunk.copy()
+        np.cumprod(chunk, axis=1, out=chunk)
+        
+        # Ensure price doesn't go below 1: replay only the paths that hit the floor
+        floored = np.flatnonzero((chunk[:, 1:] < 1.0).any(axis=1))
+        if floored.size:
+            replay = factors[floored]
+            for day in range(1, days):
+                np.maximum(replay[:, day - 1] * replay[:, day], 1.0, out=replay[:, day])
+            chunk[floored] = replay
+    
+    return paths
+
 # Function to calculate simple moving average
 def calculate_sma(prices, period):
     """
@@ -61,11 +167,11 @@ def calculate_sma(prices, period):
     """
     sma_values = [None] * (period - 1)
     
-    for i in range(period - 1, len(prices)):
-        # Calculate average of the last 'period' prices
-        period_prices = prices[i - (period - 1):i + 1]
-        average = sum(period_prices) / period
-        sma_values.append(average)
+    if len(prices) < period:
+        return sma_values
+    
+    # Running-sum average instead of re-adding every window (O(n) not O(n*period))
+    sma_values.extend(sma_array(prices, period)[period - 1:].tolist())
     
     return sma_values
 
@@ -99,7 +205,8 @@ def calculate_ema(prices, period, smoothing=2):
 
 # Main backtesting function
 def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=10000, 
-                     stop_loss_percent=5, use_ema=False, ma_function=None):
+                     stop_loss_percent=5, use_ema=False, ma_function=None, engine="loop",
+                     indicators=None, cost_model=None, volume=None):
     """
     Backtest a moving average crossover strategy on historical price data.
     
@@ -111,15 +218,38 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
         stop_loss_percent: Percentage of entry price for stop loss
         use_ema: Whether to use EMA instead of SMA
         ma_function: Custom MA function if provided
+        engine: "loop" for the day-by-day simulation, "vectorized" for the NumPy engine
+                or "event" for the event-driven engine
+        indicators: Optional IndicatorStore for these prices, so MAs already
+                    calculated for charts or other backtests are reused
+        cost_model: Optional CostModel with commission, slippage and
+                    participation settings (no costs by default)
+        volume: Optional bar volumes for the cost model's participation cap
         
     Returns:
-        Dictionary containing performance metrics
+        Dictionary containing performance metrics (trade_history is a TradeLog)
     """
+    if engine not in BACKTEST_ENGINES:
+        raise ValueError(f"Unknown backtest engine: {engine}")
+    
     # Calculate moving averages based on selected type
     if ma_function:
         # Use custom MA function if provided
         short_ma = ma_function(prices, short_period)
         long_ma = ma_function(prices, long_period)
+    elif indicators is not None:
+        # Reuse the memoized MAs for this price series
+        ma_type = "ema" if use_ema else "sma"
+        short_ma = indicators.get(ma_type, short_period)
+        long_ma = indicators.get(ma_type, long_period)
+        if engine == "loop":
+            # The day-by-day loop indexes plain floats much faster than array elements
+            short_ma, long_ma = short_ma.tolist(), long_ma.tolist()
+    elif engine == "vectorized":
+        # Keep the MAs as arrays for the NumPy engine
+        ma_array = ema_array if use_ema else sma_array
+        short_ma = ma_array(prices, short_period)
+        long_ma = ma_array(prices, long_period)
     elif use_ema:
         short_ma = calculate_ema(prices, short_period)
         long_ma = calculate_ema(prices, long_period)
@@ -127,6 +257,17 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
         short_ma = calculate_sma(prices, short_period)
         long_ma = calculate_sma(prices, long_period)
     
+    # Hand off to the NumPy engine if requested
+    if engine == "vectorized":
+        return backtest_vectorized(prices, short_ma, long_ma, short_period, long_period,
+                                   initial_capital, stop_loss_percent, cost_model, volume)
+    
+    # Or to the event-driven engine, with the crossover as a strategy plugin
+    if engine == "event":
+        strategy = CrossoverStrategy(short_period, long_period, stop_loss_percent,
+                                     short_ma=short_ma, long_ma=long_ma)
+        return EventEngine(prices, initial_capital, cost_model, volume).run(strategy)
+    
     # Initialize variables
     capital = initial_capital
     shares = 0
@@ -135,8 +276,19 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
     entry_day = 0
     stop_loss_price = 0
     
+    # Trading costs
+    cost_model = cost_model or CostModel()
+    buy_factor = cost_model.buy_factor
+    sell_factor = cost_model.sell_factor
+    commission = cost_model.commission
+    commission_rate = cost_model.commission_rate
+    share_limits = cost_model.share_limits(volume)
+    entry_commission = 0
+    commission_paid = 0
+    slippage_cost = 0
+    
     # Performance tracking
-    trades = []
+    trades = TradeLog()
     portfolio_values = [initial_capital]
     positions = [0]  # 0 = no position, 1 = long position
     max_portfolio_value = initial_capital
@@ -187,43 +339,37 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
                 
                 # Execute buy signal if not already in a position
                 if buy_signal and not in_position:
-                    # Calculate how many shares we can buy
-                    shares = math.floor(capital / next_day_price)
+                    # Calculate how many shares we can buy (after slippage and commission)
+                    fill_price = next_day_price * buy_factor
+                    shares = math.floor((capital - commission) / (fill_price * (1 + commission_rate)))
+                    if share_limits is not None:
+                        shares = min(shares, int(share_limits[current_day + 1]))
                     
                     if shares > 0:
-                        entry_price = next_day_price
-                        capital -= shares * entry_price
+                        entry_price = fill_price
+                        entry_commission = commission + shares * entry_price * commission_rate
+                        capital -= shares * entry_price + entry_commission
+                        commission_paid += entry_commission
+                        slippage_cost += shares * (entry_price - next_day_price)
                         in_position = True
                         entry_day = current_day + 1
                         
                         # Set stop loss
-                        stop_loss_price = entry_price * (1 - stop_loss_percent / 100)
+                        stop_loss_price = next_day_price * (1 - stop_loss_percent / 100)
                 
                 # Execute sell signal if in a position
                 elif (sell_signal or next_day_price <= stop_loss_price) and in_position:
                     # Sell all shares
-                    capital += shares * next_day_price
+                    exit_price = next_day_price * sell_factor
+                    exit_commission = commission + shares * exit_price * commission_rate
+                    capital += shares * exit_price - exit_commission
+                    commission_paid += exit_commission
+                    slippage_cost += shares * (next_day_price - exit_price)
                     
                     # Record the trade
-                    exit_day = current_day + 1
-                    exit_price = next_day_price
-                    profit_loss = (exit_price - entry_price) * shares
-                    profit_loss_percent = (exit_price / entry_price - 1) * 100
-                    trade_duration = exit_day - entry_day
-                    
-                    trade_info = {
-                        "entry_day": entry_day,
-                        "entry_price": entry_price,
-                        "exit_day": exit_day,
-                        "exit_price": exit_price,
-                        "shares": shares,
-                        "profit_loss": profit_loss,
-                        "profit_loss_percent": profit_loss_percent,
-                        "duration": trade_duration,
-                        "exit_reason": "Stop Loss" if next_day_price <= stop_loss_price else "Sell Signal"
-                    }
-                    
-                    trades.append(trade_info)
+                    exit_reason = "Stop Loss" if next_day_price <= stop_loss_price else "Sell Signal"
+                    trades.append(entry_day, entry_price, current_day + 1, exit_price, shares, exit_reason,
+                                  commission=entry_commission + exit_commission)
                     
                     # Reset position tracking
                     shares = 0
@@ -245,18 +391,8 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
     # Calculate performance metrics
     total_return = (final_portfolio_value / initial_capital - 1) * 100
     
-    winning_trades = [t for t in trades if t["profit_loss"] > 0]
-    win_rate = len(winning_trades) / len(trades) * 100 if trades else 0
-    
-    # Calculate average win and loss
-    avg_win = sum([t["profit_loss"] for t in winning_trades]) / len(winning_trades) if winning_trades else 0
-    losing_trades = [t for t in trades if t["profit_loss"] < 0]
-    avg_loss = sum([t["profit_loss"] for t in losing_trades]) / len(losing_trades) if losing_trades else 0
-    
-    # Calculate profit factor
-    gross_profit = sum([t["profit_loss"] for t in winning_trades]) if winning_trades else 0
-    gross_loss = abs(sum([t["profit_loss"] for t in losing_trades])) if losing_trades else 0
-    profit_factor = gross_profit / gross_loss if gross_loss > 0 else float('inf')
+    # Win rate, average win/loss and profit factor from the trade log's columns
+    trade_stats = trades.summary()
     
     # Calculate annualized return
     trading_days = len(prices)
@@ -271,59 +407,69 @@ def backtest_strategy(prices, short_period=10, long_period=30, initial_capital=1
         "total_return_percent": total_return,
         "annualized_return_percent": annualized_return,
         "total_trades": len(trades),
-        "winning_trades": len(winning_trades),
-        "losing_trades": len(trades) - len(winning_trades),
-        "win_rate_percent": win_rate,
-        "avg_win": avg_win,
-        "avg_loss": avg_loss,
-        "profit_factor": profit_factor,
+        "winning_trades": trade_stats["winning_trades"],
+        "losing_trades": len(trades) - trade_stats["winning_trades"],
+        "win_rate_percent": trade_stats["win_rate_percent"],
+        "avg_win": trade_stats["avg_win"],
+        "avg_loss": trade_stats["avg_loss"],
+        "profit_factor": trade_stats["profit_factor"],
         "max_drawdown_percent": max_drawdown,
         "trade_history": trades,
         "portfolio_history": portfolio_values,
         "positions": positions,
-        "drawdowns": drawdowns
+        "drawdowns": drawdowns,
+        **cost_metrics(commission_paid, slippage_cost, initial_capital)
     }
     
     return metrics
 
 # Create date range for plotly charts
-def create_date_range(num_days):
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=num_days)
+def create_date_range(num_days, start_date=SYNTHETIC_START_DATE):
     dates = [start_date + timedelta(days=i) for i in range(num_days)]
     return [date.strftime("%Y-%m-%d") for date in dates]
 
+# Downsample a series (and its dates) to a point budget for plotting
+def downsample_series(values, dates, max_points=None, method='minmax', keep=None):
+    if max_points is None or len(values) <= max_points:
+        return values, dates
+    
+    indices = downsample_indices(values, max_points, method, keep)
+    values = np.asarray(values, dtype=np.float64)[indices]
+    return values, [dates[i] for i in indices]
+
+# Function to drop the leading None/NaN values of an indicator
+def trim_leading_gap(values, dates):
+    values = np.asarray(values, dtype=np.float64)  # None becomes NaN
+    established = ~np.isnan(values)
+    first = int(established.argmax()) if established.any() else len(values)
+    return values[first:], dates[first:]
+
 # Create plotly figure for price and moving averages
-def create_price_chart(prices, short_ma, long_ma, trades=None, dates=None):
+def create_price_chart(prices, short_ma, long_ma, trades=None, dates=None, max_points=None, method='minmax'):
     if dates is None:
         dates = create_date_range(len(prices))
     
     # Create figure
     fig = go.Figure()
     
-    # Add price line
+    # Add price line (trade days are always kept so markers sit on the line)
+    trade_days = np.concatenate((trades.entry_day, trades.exit_day)) if trades else None
+    price_values, price_dates = downsample_series(prices, dates, max_points, method, trade_days)
+    
     fig.add_trace(go.Scatter(
-        x=dates,
-        y=prices,
+        x=price_dates,
+        y=price_values,
         mode='lines',
         name='Price',
         line=dict(color='#2E86C1', width=2)
     ))
     
-    # Add moving averages
-    if short_ma[0] is None:
-        # Remove None values from the beginning
-        short_ma_dates = dates[len([x for x in short_ma if x is None]):]
-        short_ma = [x for x in short_ma if x is not None]
-    else:
-        short_ma_dates = dates
+    # Add moving averages (without the bars before each MA is established)
+    short_ma, short_ma_dates = trim_leading_gap(short_ma, dates)
+    long_ma, long_ma_dates = trim_leading_gap(long_ma, dates)
     
-    if long_ma[0] is None:
-        # Remove None values from the beginning
-        long_ma_dates = dates[len([x for x in long_ma if x is None]):]
-        long_ma = [x for x in long_ma if x is not None]
-    else:
-        long_ma_dates = dates
+    short_ma, short_ma_dates = downsample_series(short_ma, short_ma_dates, max_points, method)
+    long_ma, long_ma_dates = downsample_series(long_ma, long_ma_dates, max_points, method)
     
     fig.add_trace(go.Scatter(
         x=short_ma_dates,
@@ -343,11 +489,11 @@ def create_price_chart(prices, short_ma, long_ma, trades=None, dates=None):
     
     # Add buy/sell markers if trades are provided
     if trades:
-        buy_days = [t['entry_day'] for t in trades]
+        buy_days = trades.entry_day.tolist()
         buy_prices = [prices[day] for day in buy_days]
         buy_dates = [dates[day] for day in buy_days]
         
-        sell_days = [t['exit_day'] for t in trades]
+        sell_days = trades.exit_day.tolist()
         sell_prices = [prices[day] for day in sell_days]
         sell_dates = [dates[day] for day in sell_days]
         
@@ -398,12 +544,16 @@ def create_price_chart(prices, short_ma, long_ma, trades=None, dates=None):
     return fig
 
 # Create equity curve chart
-def create_equity_chart(portfolio_values, initial_capital, dates=None):
+def create_equity_chart(portfolio_values, initial_capital, dates=None, max_points=None, method='minmax'):
     if dates is None:
         dates = create_date_range(len(portfolio_values))
     
     fig = go.Figure()
     
+    # Keep the full date span for the initial capital line
+    first_date, last_date = dates[0], dates[-1]
+    portfolio_values, dates = downsample_series(portfolio_values, dates, max_points, method)
+    
     fig.add_trace(go.Scatter(
         x=dates,
         y=portfolio_values,
@@ -414,7 +564,7 @@ def create_equity_chart(portfolio_values, initial_capital, dates=None):
     
     # Add horizontal line for initial capital
     fig.add_trace(go.Scatter(
-        x=[dates[0], dates[-1]],
+        x=[first_date, last_date],
         y=[initial_capital, initial_capital],
         mode='lines',
         name='Initial Capital',
@@ -440,12 +590,14 @@ def create_equity_chart(portfolio_values, initial_capital, dates=None):
     return fig
 
 # Create drawdown chart
-def create_drawdown_chart(drawdowns, dates=None):
+def create_drawdown_chart(drawdowns, dates=None, max_points=None, method='minmax'):
     if dates is None:
         dates = create_date_range(len(drawdowns))
     
     fig = go.Figure()
     
+    drawdowns, dates = downsample_series(drawdowns, dates, max_points, method)
+    
     fig.add_trace(go.Scatter(
         x=dates,
         y=[-d for d in drawdowns],  # Negate for better visualization (downward)
@@ -486,66 +638,163 @@ def run_backtest():
     initial_capital = float(data.get('initial_capital', 10000))
     stop_loss = float(data.get('stop_loss', 5))
     ma_type = data.get('ma_type', 'sma')  # 'sma' or 'ema'
+    engine = data.get('engine', 'loop')  # 'loop' or 'vectorized'
+    seed = data.get('seed')  # Optional, makes the price series reproducible
+    dataset = data.get('dataset')  # Optional, backtest on stored candles instead
+    timeframe = data.get('timeframe')  # Optional, resample the dataset's candles first
+    full_resolution = bool(data.get('full_resolution', False))  # Send every point to the charts
+    max_points = None if full_resolution else int(data.get('max_points', DEFAULT_CHART_POINTS))
+    downsample = data.get('downsample', 'minmax')  # 'minmax' or 'lttb'
+    response_format = data.get('format', 'json')  # 'json' or 'compact' (typed arrays)
+    debug = bool(data.get('debug', False))  # Return per-stage timings (responses are not cached)
+    timer = StageTimer('backtest', count_allocations=debug)
+    job_progress = g.get('job_progress')  # Set when running as a background job
     
-    # Generate price data
-    prices = generate_price_data(
-        start_price=start_price,
-        days=days,
-        volatility=volatility
-    )
+    # Report a finished stage to a background job (raises JobCancelled once it is cancelled)
+    def report_stage(stage):
+        if job_progress is not None:
+            job_progress(stage, BACKTEST_JOB_STAGES)
     
-    # Calculate MAs for charting
-    if ma_type == 'ema':
-        short_ma = calculate_ema(prices, short_period)
-        long_ma = calculate_ema(prices, long_period)
-        use_ema = True
+    try:
+        cost_model = CostModel.from_dict(data)  # Commission, slippage and participation cap
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if engine not in BACKTEST_ENGINES:
+        return jsonify({'error': f"Unknown engine '{engine}'"}), 400
+    if downsample not in DOWNSAMPLE_METHODS:
+        return jsonify({'error': f"Unknown downsampling method '{downsample}'"}), 400
+    if response_format not in ('json', 'compact'):
+        return jsonify({'error': f"Unknown response format '{response_format}'"}), 400
+    
+    if dataset and dataset not in DATASETS:
+        return jsonify({'error': f"Unknown dataset '{dataset}'"}), 400
+    if timeframe and not dataset:
+        return jsonify({'error': 'timeframe can only be used with a dataset'}), 400
+    if timeframe and timeframe not in TIMEFRAMES:
+        return jsonify({'error': f"Unknown timeframe '{timeframe}'"}), 400
+    
+    # Responses are only reproducible (and so cacheable) for stored data or seeded prices
+    cache_key = None
+    if (dataset or seed is not None) and not debug:
+        cache_params = {
+            'short_period': short_period, 'long_period': long_period,
+            'initial_capital': initial_capital, 'stop_loss': stop_loss, 'ma_type': ma_type,
+            'engine': engine, 'max_points': max_points, 'downsample': downsample, 'format': response_format,
+            **cost_model.to_dict()
+        }
+        if dataset:
+            # The file's modification time invalidates entries when the data is updated
+            cache_params.update(dataset=dataset, timeframe=timeframe, start_date=data.get('start_date'),
+                                end_date=data.get('end_date'),
+                                mtime=os.path.getmtime(DATASETS[dataset]))
+        else:
+            cache_params.update(seed=seed, days=days, start_price=start_price, volatility=volatility)
+        cache_key = make_cache_key(cache_params)
+        
+        with timer.stage('cache_lookup'):
+            cached = result_cache.get(cache_key)
+        if cached is not None:
+            stage_metrics.record(timer)
+            return Response(cached, mimetype='application/json', headers={'X-Cache': 'HIT'})
+    
+    volume = None
+    if dataset:
+        # Load close prices from a stored OHLCV file (volumes too for the participation cap)
+        with timer.stage('load_prices'):
+            columns = ("close",) if cost_model.max_participation_percent is None else ("close", "volume")
+            if timeframe:
+                candles = load_resampled(dataset, timeframe, RESAMPLE_DIR, columns,
+                                         data.get('start_date'), data.get('end_date'))
+            else:
+                candles = load_ohlcv(dataset, columns, data.get('start_date'), data.get('end_date'))
+            bar_dates, prices, volume = candles['date'], candles['close'], candles.get('volume')
+            if len(prices) < 2:
+                return jsonify({'error': 'No data in the selected date range'}), 400
+            
+            dates = format_dates(bar_dates)
     else:
-        short_ma = calculate_sma(prices, short_period)
-        long_ma = calculate_sma(prices, long_period)
-        use_ema = False
+        # Generate price data
+        with timer.stage('generate_prices'):
+            prices = generate_price_data(
+                start_price=start_price,
+                days=days,
+                volatility=volatility,
+                seed=seed
+            )
+            
+            # Generate date range for charts
+            dates = create_date_range(len(prices))
+    report_stage(1)
+    
+    # Calculate MAs once; the charts and the backtest share them
+    with timer.stage('indicators'):
+        indicators = IndicatorStore(prices)
+        use_ema = ma_type == 'ema'
+        short_ma = indicators.get('ema' if use_ema else 'sma', short_period)
+        long_ma = indicators.get('ema' if use_ema else 'sma', long_period)
+    report_stage(2)
     
     # Run backtest
-    results = backtest_strategy(
-        prices,
-        short_period=short_period,
-        long_period=long_period,
-        initial_capital=initial_capital,
-        stop_loss_percent=stop_loss,
-        use_ema=use_ema
-    )
+    with timer.stage('simulate'):
+        results = backtest_strategy(
+            prices,
+            short_period=short_period,
+            long_period=long_period,
+            initial_capital=initial_capital,
+            stop_loss_percent=stop_loss,
+            use_ema=use_ema,
+            engine=engine,
+            indicators=indicators,
+            cost_model=cost_model,
+            volume=volume
+        )
+    report_stage(3)
     
-    # Generate date range for charts
-    dates = create_date_range(len(prices))
+    # Compact mode: send raw typed arrays and let the browser format and chart them
+    if response_format == 'compact':
+        start_day = max(short_period, long_period) - 1
+        with timer.stage('compact_arrays'):
+            payload = build_compact_payload(prices, short_ma, long_ma, results, dates,
+                                            start_day, max_points, downsample)
+        return cache_response(cache_key, payload, timer, debug)
     
     # Create charts
-    price_chart = create_price_chart(prices, short_ma, long_ma, results['trade_history'], dates)
-    equity_chart = create_equity_chart(results['portfolio_history'], initial_capital, dates)
-    drawdown_chart = create_drawdown_chart(results['drawdowns'], dates)
+    with timer.stage('charts'):
+        price_chart = create_price_chart(prices, short_ma, long_ma, results['trade_history'], dates,
+                                         max_points, downsample)
+        equity_chart = create_equity_chart(results['portfolio_history'], initial_capital, dates,
+                                           max_points, downsample)
+        drawdown_chart = create_drawdown_chart(results['drawdowns'], dates, max_points, downsample)
+    report_stage(4)
     
     # Convert charts to JSON
-    price_chart_json = json.dumps(price_chart, cls=plotly.utils.PlotlyJSONEncoder)
-    equity_chart_json = json.dumps(equity_chart, cls=plotly.utils.PlotlyJSONEncoder)
-    drawdown_chart_json = json.dumps(drawdown_chart, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # Format trades for display
-    formatted_trades = []
-    for trade in results['trade_history']:
-        formatted_trade = {
-            'entry_date': dates[trade['entry_day']],
-            'entry_price': f"${trade['entry_price']:.2f}",
-            'exit_date': dates[trade['exit_day']],
-            'exit_price': f"${trade['exit_price']:.2f}",
-            'shares': trade['shares'],
-            'profit_loss': f"${trade['profit_loss']:.2f}",
-            'profit_loss_percent': f"{trade['profit_loss_percent']:.2f}%",
-            'profit_loss_class': 'positive' if trade['profit_loss'] > 0 else 'negative',
-            'duration': f"{trade['duration']} days",
-            'exit_reason': trade['exit_reason']
-        }
-        formatted_trades.append(formatted_trade)
+    with timer.stage('chart_json'):
+        price_chart_json = json.dumps(price_chart, cls=plotly.utils.PlotlyJSONEncoder)
+        equity_chart_json = json.dumps(equity_chart, cls=plotly.utils.PlotlyJSONEncoder)
+        drawdown_chart_json = json.dumps(drawdown_chart, cls=plotly.utils.PlotlyJSONEncoder)
+    
+    # Format trades for display (the only place trades become dictionaries)
+    with timer.stage('format_trades'):
+        formatted_trades = []
+        for trade in results['trade_history'].to_dicts():
+            formatted_trade = {
+                'entry_date': dates[trade['entry_day']],
+                'entry_price': f"${trade['entry_price']:.2f}",
+                'exit_date': dates[trade['exit_day']],
+                'exit_price': f"${trade['exit_price']:.2f}",
+                'shares': trade['shares'],
+                'commission': f"${trade['commission']:.2f}",
+                'profit_loss': f"${trade['profit_loss']:.2f}",
+                'profit_loss_percent': f"{trade['profit_loss_percent']:.2f}%",
+                'profit_loss_class': 'positive' if trade['profit_loss'] > 0 else 'negative',
+                'duration': f"{trade['duration']} days",
+                'exit_reason': trade['exit_reason']
+            }
+            formatted_trades.append(formatted_trade)
     
     # Return results
-    return jsonify({
+    return cache_response(cache_key, {
         'metrics': {
             'initial_capital': f"${results['initial_capital']:,.2f}",
             'final_value': f"${results['final_portfolio_value']:,.2f}",
@@ -560,7 +809,9 @@ def run_backtest():
             'avg_win': f"${results['avg_win']:.2f}" if results['avg_win'] else "$0.00",
             'avg_loss': f"${results['avg_loss']:.2f}" if results['avg_loss'] else "$0.00",
             'profit_factor': f"{results['profit_factor']:.2f}" if results['profit_factor'] != float('inf') else "∞",
-            'max_drawdown': f"{results['max_drawdown_percent']:.2f}%"
+            'max_drawdown': f"{results['max_drawdown_percent']:.2f}%",
+            'total_costs': f"${results['total_costs']:,.2f}",
+            'cost_drag': f"{results['cost_drag_percent']:.2f}%"
         },
         'trades': formatted_trades,
         'charts': {
@@ -568,8 +819,306 @@ def run_backtest():
             'equity_chart': equity_chart_json,
             'drawdown_chart': drawdown_chart_json
         }
+    }, timer, debug)
+
+# Function to serialise a response and store it in the result cache
+def cache_response(cache_key, payload, timer=None, include_timings=False):
+    """
+    Encode a response, cache it and record the request's stage timings.
+
+    Args:
+        cache_key: Result cache key, or None for responses that are not cached
+        payload: JSON-serialisable response body
+        timer: Optional StageTimer of the request
+        include_timings: Add the timer's report to the response as "timings"
+    """
+    if timer is None:
+        response = jsonify(payload)
+    else:
+        with timer.stage('encode'):
+            response = jsonify(payload)
+    if cache_key is not None:
+        result_cache.put(cache_key, response.get_data())
+        response.headers['X-Cache'] = 'MISS'
+    
+    if timer is not None:
+        stage_metrics.record(timer)
+        if include_timings:
+            # Encoded a second time so the timings include the encoding itself
+            response = jsonify(dict(payload, timings=timer.report()))
+    return response
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format by default, JSON with ?format=json
+    if request.args.get('format') == 'json':
+        return jsonify(stage_metrics.summary())
+    return Response(stage_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache', methods=['GET', 'DELETE'])
+def cache_stats():
+    if request.method == 'DELETE':
+        result_cache.clear()
+    return jsonify(result_cache.stats())
+
+@app.route('/api/datasets')
+def list_datasets():
+    return jsonify({'datasets': sorted(DATASETS)})
+
+@app.route('/api/montecarlo', methods=['POST'])
+def run_monte_carlo_test():
+    # Get parameters from request
+    data = request.get_json()
+    
+    # Parse parameters
+    n_paths = int(data.get('n_paths', 1000))
+    days = int(data.get('days', 252))
+    start_price = float(data.get('start_price', 100))
+    volatility = float(data.get('volatility', 0.015))
+    short_period = int(data.get('short_period', 10))
+    long_period = int(data.get('long_period', 30))
+    initial_capital = float(data.get('initial_capital', 10000))
+    stop_loss = float(data.get('stop_loss', 5))
+    ma_type = data.get('ma_type', 'sma')  # 'sma' or 'ema'
+    bins = int(data.get('bins', 20))
+    seed = data.get('seed')
+    
+    if n_paths < 1 or days < 2:
+        return jsonify({'error': 'n_paths must be at least 1 and days at least 2'}), 400
+    if n_paths * days > MAX_MONTE_CARLO_CELLS:
+        return jsonify({'error': f"n_paths x days must not exceed {MAX_MONTE_CARLO_CELLS:,}"}), 400
+    
+    # Simulate all price paths at once
+    paths = generate_price_paths(
+        n_paths,
+        days,
+        start_price=start_price,
+        volatility=volatility,
+        seed=seed
+    )
+    
+    # Run the strategy on every path and summarize the outcomes
+    results = run_monte_carlo(
+        paths,
+        short_period=short_period,
+        long_period=long_period,
+        initial_capital=initial_capital,
+        stop_loss_percent=stop_loss,
+        use_ema=ma_type == 'ema',
+        bins=bins,
+        progress=g.get('job_progress')  # Set when running as a background job
+    )
+    
+    return jsonify(results)
+
+@app.route('/api/optimize', methods=['POST'])
+def run_optimization():
+    # Get parameters from request
+    data = request.get_json()
+    
+    # Parse price parameters
+    days = int(data.get('days', 252))
+    start_price = float(data.get('start_price', 100))
+    volatility = float(data.get('volatility', 0.015))
+    initial_capital = float(data.get('initial_capital', 10000))
+    sort_by = data.get('sort_by', 'total_return_percent')
+    top_n = int(data.get('top_n', 20))
+    seed = data.get('seed')
+    workers = int(data.get('workers', 1))
+    
+    if sort_by not in ('total_return_percent', 'max_drawdown_percent', 'profit_factor', 'win_rate_percent'):
+        return jsonify({'error': f"Cannot rank by '{sort_by}'"}), 400
+    try:
+        cost_model = CostModel.from_dict(data)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Generate price data
+    prices = generate_price_data(
+        start_price=start_price,
+        days=days,
+        volatility=volatility,
+        seed=seed
+    )
+    
+    # Evaluate the whole parameter grid
+    try:
+        rows = sweep(
+            prices,
+            short_periods=data.get('short_periods', {'start': 5, 'stop': 20, 'step': 5}),
+            long_periods=data.get('long_periods', {'start': 30, 'stop': 60, 'step': 10}),
+            stop_losses=data.get('stop_losses', [5]),
+            ma_types=data.get('ma_types', ['sma']),
+            initial_capital=initial_capital,
+            sort_by=sort_by,
+            max_workers=workers,
+            cost_model=cost_model,
+            progress=g.get('job_progress')  # Set when running as a background job
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Infinity is not valid JSON, so report an undefined profit factor as null
+    for row in rows:
+        if row['profit_factor'] == float('inf'):
+            row['profit_factor'] = None
+    
+    return jsonify({
+        'combinations': len(rows),
+        'sort_by': sort_by,
+        'results': rows[:top_n]
     })
 
+@app.route('/api/walkforward', methods=['POST'])
+def run_walk_forward():
+    # Get parameters from request
+    data = request.get_json()
+    
+    # Parse price parameters
+    days = int(data.get('days', 2520))
+    start_price = float(data.get('start_price', 100))
+    volatility = float(data.get('volatility', 0.015))
+    initial_capital = float(data.get('initial_capital', 10000))
+    train_bars = int(data.get('train_bars', 504))
+    test_bars = int(data.get('test_bars', 126))
+    anchored = bool(data.get('anchored', False))
+    sort_by = data.get('sort_by', 'total_return_percent')
+    seed = data.get('seed')
+    workers = int(data.get('workers', 1))
+    
+    if sort_by not in ('total_return_percent', 'max_drawdown_percent', 'profit_factor', 'win_rate_percent'):
+        return jsonify({'error': f"Cannot rank by '{sort_by}'"}), 400
+    if train_bars < 2 or test_bars < 2:
+        return jsonify({'error': 'train_bars and test_bars must be at least 2'}), 400
+    try:
+        cost_model = CostModel.from_dict(data)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Generate price data
+    prices = generate_price_data(
+        start_price=start_price,
+        days=days,
+        volatility=volatility,
+        seed=seed
+    )
+    
+    # Optimise on each train window and trade the winner on the next test window
+    try:
+        results = walk_forward(
+            prices,
+            train_bars,
+            test_bars,
+            short_periods=data.get('short_periods', {'start': 5, 'stop': 20, 'step': 5}),
+            long_periods=data.get('long_periods', {'start': 30, 'stop': 60, 'step': 10}),
+            stop_losses=data.get('stop_losses', [5]),
+            ma_types=data.get('ma_types', ['sma']),
+            initial_capital=initial_capital,
+            sort_by=sort_by,
+            anchored=anchored,
+            max_workers=workers,
+            cost_model=cost_model,
+            progress=g.get('job_progress')  # Set when running as a background job
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Infinity is not valid JSON, so report an undefined profit factor as null
+    for window in results['windows']:
+        if window['train_sort_value'] == float('inf'):
+            window['train_sort_value'] = None
+    
+    return jsonify({
+        'metrics': {
+            'initial_capital': results['initial_capital'],
+            'final_value': results['final_portfolio_value'],
+            'total_return': results['total_return_percent'],
+            'annualized_return': results['annualized_return_percent'],
+            'total_trades': results['total_trades'],
+            'win_rate': results['win_rate_percent'],
+            'profit_factor': results['profit_factor'] if results['profit_factor'] != float('inf') else None,
+            'max_drawdown': results['max_drawdown_percent'],
+            'total_costs': results['total_costs'],
+            'cost_drag': results['cost_drag_percent']
+        },
+        'windows': results['windows'],
+        'equity': results['portfolio_history'][1:].tolist()
+    })
+
+# Function to run an API endpoint as a background job
+def run_endpoint_job(view, params, progress):
+    """
+    Run an API view function on a job's parameters outside a real request.
+
+    Args:
+        view: View function of the endpoint
+        params: Request body of the job
+        progress: Progress callback of the job (see jobs.JobQueue)
+
+    Returns:
+        The serialised JSON response
+    """
+    with app.test_request_context(json=params):
+        g.job_progress = progress
+        response = app.make_response(view())
+    if response.status_code != 200:
+        raise ValueError(response.get_json().get('error', f"Request failed with status {response.status_code}"))
+    return response.get_data()
+
+# Function to get the job queue, starting it on first use
+def get_job_queue():
+    global job_queue
+    with job_queue_lock:
+        if job_queue is None:
+            # Endpoints that can run as jobs, with the same request bodies
+            handlers = {kind: partial(run_endpoint_job, view) for kind, view in (
+                ('backtest', run_backtest),
+                ('montecarlo', run_monte_carlo_test),
+                ('optimize', run_optimization),
+                ('walkforward', run_walk_forward)
+            )}
+            job_queue = JobQueue(JOB_DB_PATH, handlers, JOB_WORKERS, JOB_QUEUE_DEPTH)
+        return job_queue
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def submit_job():
+    queue = get_job_queue()
+    if request.method == 'GET':
+        return jsonify(queue.stats())
+    
+    data = request.get_json()
+    kind = data.get('kind')
+    params = data.get('params', {})
+    
+    if kind not in queue.handlers:
+        return jsonify({'error': f"Unknown job kind '{kind}'"}), 400
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params must be an object'}), 400
+    
+    try:
+        job_id = queue.submit(kind, params)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({'id': job_id, 'status': 'queued'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    queue = get_job_queue()
+    if request.method == 'DELETE':
+        queue.cancel(job_id)
+    
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Unknown job '{job_id}'"}), 404
+    
+    # The stored result is already JSON; splice it in rather than decoding it
+    result = job.pop('result')
+    body = json.dumps(job)
+    if result is not None:
+        body = body[:-1] + ', "result": ' + result.decode('utf-8') + '}'
+    return Response(body, mimetype='application/json')
+
 @app.route('/about')
 def about():
     return render_template('about.html')
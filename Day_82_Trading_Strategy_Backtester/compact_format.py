@@ -0,0 +1,143 @@
+"""
+Compact Backtest Response Format
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Packs backtest results as raw numbers instead of preformatted strings and
+Plotly JSON. Series are sent as base64-encoded little-endian typed arrays
+(float32 for chart values, float64 for dates and trade amounts) and the
+browser does the formatting and chart building.
+"""
+
+import base64
+import numpy as np
+from downsampling import downsample_indices
+
+
+# Function to encode an array as a base64 typed-array buffer
+def encode_array(values, dtype):
+    """
+    Encode values as a base64 string of a little-endian typed array.
+
+    Args:
+        values: List or array of numbers (None becomes NaN for float types)
+        dtype: NumPy dtype string, e.g. '<f4', '<f8', '<i4' or 'u1'
+
+    Returns:
+        Dictionary with the dtype and the base64 data
+    """
+    data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+    return {"dtype": dtype, "data": base64.b64encode(data).decode("ascii")}
+
+# Function to align the equity curve with the price bars
+def align_equity(portfolio_history, final_portfolio_value, num_bars, start_day, initial_capital):
+    """
+    Stretch the portfolio history to one value per price bar.
+
+    The history starts with the initial capital and then has one value per
+    simulated bar from start_day; bars before start_day hold the initial
+    capital and the last bar holds the final portfolio value.
+
+    Args:
+        portfolio_history: portfolio_history from backtest_strategy
+        final_portfolio_value: Final portfolio value
+        num_bars: Number of price bars
+        start_day: First simulated bar
+        initial_capital: Starting capital amount
+
+    Returns:
+        NumPy array of portfolio values, one per bar
+    """
+    equity = np.full(num_bars, float(initial_capital))
+    history = np.asarray(portfolio_history, dtype=np.float64)[1:]
+    equity[start_day:start_day + len(history)] = history
+    if num_bars > start_day:
+        equity[-1] = final_portfolio_value
+    return equity
+
+# Function to build the compact payload for /api/backtest
+def build_compact_payload(prices, short_ma, long_ma, results, dates, start_day,
+                          max_points=None, method="minmax"):
+    """
+    Build the compact (typed-array) version of a backtest response.
+
+    Args:
+        prices: List or array of prices
+        short_ma: Short-term MA values (None/NaN before it is established)
+        long_ma: Long-term MA values (None/NaN before it is established)
+        results: Metrics dictionary from backtest_strategy
+        dates: List of date strings, one per bar
+        start_day: First simulated bar of the backtest
+        max_points: Point budget for the chart series (None sends every bar)
+        method: Downsampling method ('minmax' or 'lttb')
+
+    Returns:
+        JSON-serialisable dictionary
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_bars = len(prices)
+    trades = results["trade_history"]
+
+    equity = align_equity(results["portfolio_history"], results["final_portfolio_value"],
+                          num_bars, start_day, results["initial_capital"])
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = (peaks - equity) / peaks * 100
+
+    # A position taken after bar d is held during bar d + 1
+    positions = np.zeros(num_bars, dtype=np.uint8)
+    held = np.asarray(results["positions"], dtype=np.uint8)[1:]
+    positions[start_day + 1:start_day + 1 + len(held)] = held
+
+    # One shared set of bars for every series; trade bars are always included
+    trade_days = np.concatenate((trades.entry_day, trades.exit_day))
+    bars = downsample_indices(prices, max_points, method, trade_days)
+    if max_points is not None and num_bars > max_points:
+        bars = np.union1d(bars, downsample_indices(equity, max_points, method))
+
+    bar_dates = np.array([dates[i] for i in bars], dtype="datetime64[ms]").astype(np.int64)
+
+    profit_factor = results["profit_factor"]
+
+    return {
+        "format": "compact",
+        "num_bars": num_bars,
+        "metrics": {
+            "initial_capital": results["initial_capital"],
+            "final_value": results["final_portfolio_value"],
+            "total_return": results["total_return_percent"],
+            "annualized_return": results["annualized_return_percent"],
+            "total_trades": results["total_trades"],
+            "winning_trades": results["winning_trades"],
+            "losing_trades": results["losing_trades"],
+            "win_rate": results["win_rate_percent"],
+            "avg_win": results["avg_win"],
+            "avg_loss": results["avg_loss"],
+            "profit_factor": None if profit_factor == float("inf") else profit_factor,
+            "max_drawdown": results["max_drawdown_percent"],
+            "total_costs": results["total_costs"],
+            "cost_drag": results["cost_drag_percent"]
+        },
+        "series": {
+            "bar": encode_array(bars, "<i4"),
+            "date": encode_array(bar_dates, "<f8"),  # Milliseconds since the epoch
+            "price": encode_array(prices[bars], "<f4"),
+            "short_ma": encode_array(np.asarray(short_ma, dtype=np.float64)[bars], "<f4"),
+            "long_ma": encode_array(np.asarray(long_ma, dtype=np.float64)[bars], "<f4"),
+            "equity": encode_array(equity[bars], "<f4"),
+            "drawdown": encode_array(drawdowns[bars], "<f4"),
+            "position": encode_array(positions[bars], "u1")
+        },
+        "trades": {
+            "count": len(trades),
+            "exit_reasons": list(trades.reasons),
+            "entry_day": encode_array(trades.entry_day, "<i4"),
+            "exit_day": encode_array(trades.exit_day, "<i4"),
+            "entry_price": encode_array(trades.entry_price, "<f8"),
+            "exit_price": encode_array(trades.exit_price, "<f8"),
+            "shares": encode_array(trades.shares, "<f8"),
+            "commission": encode_array(trades.commission, "<f8"),
+            "profit_loss": encode_array(trades.profit_loss, "<f8"),
+            "profit_loss_percent": encode_array(trades.profit_loss_percent, "<f8"),
+            "exit_reason": encode_array(trades.exit_reason, "u1")
+        }
+    }
@@ -0,0 +1,115 @@
+"""
+Transaction Cost Model
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Commission, slippage and volume participation settings shared by the
+backtest engines. The model only holds numbers: the engines apply them with
+plain arithmetic (or whole-array operations) inside their own loops, so
+costs never add a per-trade function call to a sweep.
+"""
+
+import math
+import numpy as np
+
+# Request parameters that configure a CostModel
+COST_PARAMETERS = ("commission", "commission_percent", "slippage_bps", "max_participation_percent")
+
+
+class CostModel:
+    """
+    Trading costs applied to every fill.
+
+    Buys fill slippage_bps above the bar price and sells the same amount
+    below it. Each fill pays commission plus commission_percent of its value.
+    With volume data, an entry buys at most max_participation_percent of the
+    bar's volume; exits always close the whole position.
+    """
+
+    __slots__ = ("commission", "commission_percent", "slippage_bps", "max_participation_percent")
+
+    def __init__(self, commission=0.0, commission_percent=0.0, slippage_bps=0.0,
+                 max_participation_percent=None):
+        if not all(math.isfinite(value) and value >= 0
+                   for value in (commission, commission_percent, slippage_bps)):
+            raise ValueError("Commission and slippage must be finite and not negative")
+        if slippage_bps >= 10000:
+            raise ValueError("slippage_bps must be below 10000 (100%)")
+        # The comparison is False for NaN, so NaN is rejected as well
+        if max_participation_percent is not None and not 0 < max_participation_percent <= 100:
+            raise ValueError("max_participation_percent must be between 0 and 100")
+
+        self.commission = float(commission)
+        self.commission_percent = float(commission_percent)
+        self.slippage_bps = float(slippage_bps)
+        self.max_participation_percent = max_participation_percent
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a cost model from request parameters.
+
+        Args:
+            data: Dictionary that may contain any of COST_PARAMETERS
+
+        Returns:
+            CostModel (all zero when none of the parameters are present)
+        """
+        settings = {name: float(data[name]) for name in COST_PARAMETERS if data.get(name) is not None}
+        return cls(**settings)
+
+    def to_dict(self):
+        """The model's parameters as a dictionary"""
+        return {name: getattr(self, name) for name in COST_PARAMETERS}
+
+    @property
+    def buy_factor(self):
+        """Multiplier from bar price to buy fill price"""
+        return 1 + self.slippage_bps / 10000
+
+    @property
+    def sell_factor(self):
+        """Multiplier from bar price to sell fill price"""
+        return 1 - self.slippage_bps / 10000
+
+    @property
+    def commission_rate(self):
+        """Commission as a fraction of fill value"""
+        return self.commission_percent / 100
+
+    def share_limits(self, volume):
+        """
+        Largest entry per bar allowed by the participation cap.
+
+        Args:
+            volume: Array of bar volumes, or None
+
+        Returns:
+            Array of share limits per bar, or None when there is no cap
+        """
+        if volume is None or self.max_participation_percent is None:
+            return None
+        volume = np.asarray(volume, dtype=np.float64)
+        return np.floor(volume * (self.max_participation_percent / 100))
+
+# Function to report the cost drag of a backtest
+def cost_metrics(commission_paid, slippage_cost, initial_capital):
+    """
+    Summarise what trading costs took out of a backtest.
+
+    Args:
+        commission_paid: Total commission paid
+        slippage_cost: Total value lost to slippage
+        initial_capital: Starting capital amount
+
+    Returns:
+        Dictionary with commission, slippage, their total and the total as a
+        percentage of the initial capital
+    """
+    total_costs = commission_paid + slippage_cost
+    return {
+        "commission_paid": commission_paid,
+        "slippage_cost": slippage_cost,
+        "total_costs": total_costs,
+        "cost_drag_percent": total_costs / initial_capital * 100
+    }
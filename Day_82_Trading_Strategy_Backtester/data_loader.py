@@ -0,0 +1,239 @@
+"""
+Market Data Loader
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Columnar OHLCV loading for the backtester. Feather/Arrow files are memory
+mapped and only the requested columns are read; for uncompressed files the
+returned NumPy arrays are zero-copy views of the mapped file. Parquet and
+CSV files are supported through the same interface.
+"""
+
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Feather/Parquet support is optional; CSV works without it
+    pa = None
+
+# Candles shipped with the repository
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Day-66-Gradient-Descent")
+DATASETS = {
+    "BTC_USDT-1d": os.path.join(DATA_DIR, "BTC_USDT-1d.feather"),
+    "BTC_USDT-5m": os.path.join(DATA_DIR, "BTC_USDT-5m.feather"),
+}
+
+DATE_COLUMN = "date"
+
+
+# Function to make a data file available by name
+def register_dataset(name, path):
+    """
+    Register a data file so it can be loaded (and requested over the API) by name.
+
+    Args:
+        name: Dataset name
+        path: Path to a .feather/.arrow, .parquet or .csv file
+    """
+    DATASETS[name] = path
+
+# Function to turn a dataset name or path into a file path
+def resolve_dataset(source):
+    """
+    Resolve a dataset name or file path.
+
+    Args:
+        source: Registered dataset name or path to a data file
+
+    Returns:
+        Path to the data file
+    """
+    path = DATASETS.get(source, source)
+    if not os.path.isfile(path):
+        raise ValueError(f"Unknown dataset: {source}")
+    return path
+
+# Function to convert a date/time given by the user to datetime64
+def to_datetime64(value):
+    """
+    Convert a date/time to datetime64[ns]; timezone-aware values are converted to UTC.
+
+    Args:
+        value: Date string, datetime, Timestamp or None
+
+    Returns:
+        NumPy datetime64[ns] value (None when value is None)
+    """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return np.datetime64(timestamp.to_datetime64(), "ns")
+
+# Function to convert an Arrow column to NumPy without copying where possible
+def column_to_numpy(column):
+    """
+    Convert an Arrow column to a NumPy array (timestamps become datetime64[ns]).
+
+    Args:
+        column: pyarrow ChunkedArray
+
+    Returns:
+        NumPy array (a view of the Arrow buffer when the column is a single chunk without nulls)
+    """
+    if column.num_chunks == 1 and column.null_count == 0:
+        chunk = column.chunk(0)
+        if pa.types.is_timestamp(chunk.type):
+            # Timestamps are int64 nanoseconds since the epoch (UTC)
+            return chunk.view(pa.int64()).to_numpy().view("datetime64[ns]")
+        return chunk.to_numpy()
+    values = column.to_numpy()
+    if pa.types.is_timestamp(column.type):
+        values = values.astype("datetime64[ns]")
+    return values
+
+# Function to match requested column names case-insensitively
+def match_columns(available, columns):
+    """
+    Find the stored names of the requested columns, ignoring case.
+
+    Args:
+        available: Column names of the data file
+        columns: Requested column names
+
+    Returns:
+        List of stored column names, in the order requested
+
+    Raises:
+        ValueError: If a requested column is missing
+    """
+    lookup = {name.lower(): name for name in available}
+    missing = [name for name in columns if name.lower() not in lookup]
+    if missing:
+        raise ValueError(f"Columns not found: {', '.join(missing)}")
+    return [lookup[name.lower()] for name in columns]
+
+# Function to read a field position from a flatbuffer table (0 when the field is absent)
+def _flatbuffer_field(buffer, table, index):
+    vtable = table - struct.unpack_from("<i", buffer, table)[0]
+    entry = 4 + 2 * index
+    if entry >= struct.unpack_from("<H", buffer, vtable)[0]:
+        return 0
+    offset = struct.unpack_from("<H", buffer, vtable + entry)[0]
+    return table + offset if offset else 0
+
+# Function to tell whether the record batches of a mapped Arrow IPC file are compressed
+def _ipc_compressed(mapped):
+    # The first record batch message says so in its (flatbuffer) metadata:
+    # Message.header (field 2) is a RecordBatch, whose field 3 is its compression
+    messages = pa.ipc.MessageReader.open_stream(pa.BufferReader(mapped.slice(8)))  # Skip the file magic
+    for message in messages:
+        if message.type == "record batch":
+            metadata = message.metadata.to_pybytes()
+            header = _flatbuffer_field(metadata, struct.unpack_from("<I", metadata, 0)[0], 2)
+            batch = header + struct.unpack_from("<I", metadata, header)[0]
+            return _flatbuffer_field(metadata, batch, 3) != 0
+    return False
+
+# Function to load selected OHLCV columns
+def load_ohlcv(source, columns=("close",), start=None, end=None):
+    """
+    Load selected columns of an OHLCV file, optionally limited to a date range.
+
+    Feather/Arrow files are memory mapped: only the requested columns are
+    touched and, for uncompressed files, the arrays are views of the mapped
+    file rather than copies. The date range is found with a binary search
+    on the (sorted) date column and applied as a slice, so no more rows are
+    materialised than needed. Parquet files are filtered by row group.
+
+    Args:
+        source: Registered dataset name or path to a .feather/.arrow,
+                .parquet or .csv file
+        columns: Columns to load besides the date column
+        start: Optional first date/time to include
+        end: Optional last date/time to include
+
+    Returns:
+        Dictionary mapping "date" and each requested column to a NumPy array
+    """
+    path = resolve_dataset(source)
+    extension = os.path.splitext(path)[1].lower()
+    wanted = [DATE_COLUMN] + [name for name in columns if name.lower() != DATE_COLUMN]
+    start = to_datetime64(start)
+    end = to_datetime64(end)
+
+    if extension == ".csv":
+        header = pd.read_csv(path, nrows=0).columns
+        names = match_columns(header, wanted)
+        frame = pd.read_csv(path, usecols=names, parse_dates=[names[0]])
+        frame[names[0]] = pd.to_datetime(frame[names[0]], utc=True).dt.tz_localize(None)
+        data = {key: frame[name].to_numpy() for key, name in zip(wanted, names)}
+    elif extension in (".feather", ".arrow", ".ipc", ".parquet"):
+        if pa is None:
+            raise ImportError("pyarrow is required to load Feather/Parquet files")
+
+        if extension == ".parquet":
+            names = match_columns(pq.read_schema(path).names, wanted)
+            filters = []
+            if start is not None:
+                filters.append((names[0], ">=", pd.Timestamp(start, tz="UTC")))
+            if end is not None:
+                filters.append((names[0], "<=", pd.Timestamp(end, tz="UTC")))
+            table = pq.read_table(path, columns=names, filters=filters or None, memory_map=True)
+        else:
+            # Read straight from the mapped IPC file; uncompressed buffers stay in the mapping
+            mapped = pa.memory_map(path).read_buffer()
+            reader = pa.ipc.open_file(mapped)
+            names = match_columns(reader.schema.names, wanted)
+            if len(set(names)) < len(reader.schema.names) and _ipc_compressed(mapped):
+                # Only decompress the selected columns (pyarrow copies whole record
+                # batches when reading a subset, so uncompressed files are read in full)
+                fields = sorted({reader.schema.get_field_index(name) for name in names})
+                reader = pa.ipc.open_file(mapped, options=pa.ipc.IpcReadOptions(included_fields=fields))
+            table = reader.read_all()
+
+        data = {key: column_to_numpy(table.column(name)) for key, name in zip(wanted, names)}
+    else:
+        raise ValueError(f"Unsupported data file type: {extension}")
+
+    # Slice the date range out of every column (views, not copies)
+    dates = data[DATE_COLUMN]
+    first = np.searchsorted(dates, start, side="left") if start is not None else 0
+    last = np.searchsorted(dates, end, side="right") if end is not None else len(dates)
+
+    return {key: values[first:last] for key, values in data.items()}
+
+# Function to load the close prices the backtester runs on
+def load_close_prices(source, start=None, end=None):
+    """
+    Load close prices and their dates for backtesting.
+
+    Args:
+        source: Registered dataset name or path to a data file
+        start: Optional first date/time to include
+        end: Optional last date/time to include
+
+    Returns:
+        Tuple of (dates, close prices) NumPy arrays
+    """
+    data = load_ohlcv(source, columns=("close",), start=start, end=end)
+    return data[DATE_COLUMN], data["close"]
+
+# Function to format bar dates for charts and trade tables
+def format_dates(dates):
+    """
+    Format bar dates as strings, dropping the time of day for daily bars.
+
+    Args:
+        dates: NumPy datetime64 array
+
+    Returns:
+        List of date strings
+    """
+    daily = bool(np.all(dates == dates.astype("datetime64[D]")))
+    return [date.replace("T", " ") for date in np.datetime_as_string(dates, unit="D" if daily else "m")]
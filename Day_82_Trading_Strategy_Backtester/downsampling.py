@@ -0,0 +1,116 @@
+"""
+Chart Downsampling
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Reduces long price, equity and drawdown series to a fixed point budget before
+they are sent to the browser. Both methods return the indices of the points
+to keep, so the same selection can be applied to the dates.
+"""
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+
+# Function to pick the lowest and highest point of each bucket
+def minmax_indices(values, max_points):
+    """
+    Min/max bucketing: split the series into max_points/2 buckets and keep
+    the lowest and highest point of each, so no spike or dip is lost.
+
+    Args:
+        values: NumPy array of values (no NaNs)
+        max_points: Maximum number of points to keep
+
+    Returns:
+        Sorted NumPy array of indices to keep
+    """
+    num_values = len(values)
+    if num_values <= max_points:
+        return np.arange(num_values)
+
+    bucket_size = -(-num_values // max(max_points // 2, 1))  # Ceiling division
+    full_buckets = num_values // bucket_size
+    buckets = values[:full_buckets * bucket_size].reshape(full_buckets, bucket_size)
+    offsets = np.arange(full_buckets) * bucket_size
+
+    keep = [offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1), [0, num_values - 1]]
+
+    # Leftover points that don't fill a whole bucket
+    tail = values[full_buckets * bucket_size:]
+    if tail.size:
+        tail_start = full_buckets * bucket_size
+        keep.append([tail_start + tail.argmin(), tail_start + tail.argmax()])
+
+    return np.unique(np.concatenate(keep))
+
+# Function to pick points with Largest-Triangle-Three-Buckets
+def lttb_indices(values, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keep the point of each bucket that forms
+    the largest triangle with the previously kept point and the average of
+    the next bucket, which preserves the visual shape of the line.
+
+    Args:
+        values: NumPy array of values (no NaNs)
+        max_points: Maximum number of points to keep
+
+    Returns:
+        Sorted NumPy array of indices to keep
+    """
+    num_values = len(values)
+    if num_values <= max_points or max_points < 3:
+        return np.arange(num_values)
+
+    # Interior buckets between the fixed first and last points
+    edges = np.linspace(1, num_values - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = num_values - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else num_values
+
+        # Average point of the next bucket
+        next_x = (stop + next_stop - 1) / 2
+        next_y = values[stop:next_stop].mean()
+
+        x = np.arange(start, stop)
+        areas = np.abs((previous - next_x) * (values[start:stop] - values[previous])
+                       - (previous - x) * (next_y - values[previous]))
+
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
+
+# Function to choose the points of a series to plot
+def downsample_indices(values, max_points, method="minmax", keep=None):
+    """
+    Choose which points of a series to send to a chart.
+
+    Args:
+        values: List or array of values
+        max_points: Point budget for the series (None keeps every point)
+        method: 'minmax' or 'lttb'
+        keep: Optional indices that must always be kept (e.g. trade days)
+
+    Returns:
+        Sorted NumPy array of indices to keep
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if max_points is None or len(values) <= max_points:
+        return np.arange(len(values))
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    indices = lttb_indices(values, max_points) if method == "lttb" else minmax_indices(values, max_points)
+
+    if keep is not None and len(keep):
+        indices = np.union1d(indices, np.asarray(keep, dtype=np.int64))
+
+    return indices
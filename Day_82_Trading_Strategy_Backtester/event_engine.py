@@ -0,0 +1,397 @@
+"""
+Event-Driven Backtest Engine
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+A small bar-by-bar engine with pluggable strategies. A Strategy sees each bar
+through on_bar() and answers with orders (market, limit or stop); the engine
+fills them on later bars and does the accounting. The moving average
+crossover is one such strategy and reproduces backtest_strategy exactly.
+
+The bar loop is kept lean: prices are plain floats, nothing is allocated
+per bar, and pending orders are only examined when there are some.
+"""
+
+import math
+import numpy as np
+from indicators import IndicatorStore
+from trade_log import TradeLog
+from costs import CostModel, cost_metrics
+
+# Order sides and types
+BUY = "buy"
+SELL = "sell"
+MARKET = "market"
+LIMIT = "limit"
+STOP = "stop"
+
+
+class Order:
+    """
+    An order for the event engine.
+
+    A quantity of None means "as many shares as the cash allows" for a buy
+    and "the whole position" for a sell. Limit and stop orders stay active
+    until they fill or are cancelled; market orders fill on the next bar.
+    """
+
+    __slots__ = ("side", "quantity", "order_type", "price", "reason")
+
+    def __init__(self, side, quantity=None, order_type=MARKET, price=None, reason=None):
+        if side not in (BUY, SELL):
+            raise ValueError(f"Unknown order side: {side}")
+        if order_type not in (MARKET, LIMIT, STOP):
+            raise ValueError(f"Unknown order type: {order_type}")
+        if order_type != MARKET and price is None:
+            raise ValueError(f"A {order_type} order needs a price")
+
+        self.side = side
+        self.quantity = quantity
+        self.order_type = order_type
+        self.price = price
+        self.reason = reason
+
+    def triggered(self, price):
+        """Whether the order can fill at this bar's price"""
+        if self.order_type == MARKET:
+            return True
+        if self.order_type == LIMIT:
+            return price <= self.price if self.side == BUY else price >= self.price
+        return price >= self.price if self.side == BUY else price <= self.price
+
+
+class Strategy:
+    """
+    Base class for event engine strategies.
+
+    Subclasses override on_bar() and may override start() and on_fill().
+    Orders returned on a bar are filled at the earliest on the next bar.
+    """
+
+    # First bar passed to on_bar (and recorded in the portfolio history)
+    warmup = 0
+
+    def start(self, engine):
+        """Called once before the first bar; engine.prices holds the whole series"""
+        self.engine = engine
+
+    def on_bar(self, day, price):
+        """
+        Handle a new bar.
+
+        Args:
+            day: Bar index
+            price: Bar price
+
+        Returns:
+            None, or an iterable of Order objects
+        """
+        return None
+
+    def on_fill(self, order, day, price, quantity):
+        """Called after an order fills; may return more orders, like on_bar"""
+        return None
+
+
+class EventEngine:
+    """Long-only, single-instrument event-driven backtester"""
+
+    def __init__(self, prices, initial_capital=10000, cost_model=None, volume=None):
+        self.prices = prices.tolist() if isinstance(prices, np.ndarray) else list(prices)
+        self.initial_capital = initial_capital
+        self.cost_model = cost_model or CostModel()
+        self.share_limits = self.cost_model.share_limits(volume)
+
+    def cancel(self, order):
+        """Cancel a pending order (does nothing if it already filled)"""
+        if order in self.pending:
+            self.pending.remove(order)
+
+    def cancel_all(self):
+        """Cancel every pending order"""
+        self.pending.clear()
+
+    def run(self, strategy):
+        """
+        Run a strategy over the price series.
+
+        On every bar the pending orders are filled first (oldest first, at
+        the bar's price plus or minus the cost model's slippage), then the
+        portfolio is valued and the strategy is asked for new orders.
+
+        Args:
+            strategy: Strategy instance
+
+        Returns:
+            Dictionary containing performance metrics (same keys as backtest_strategy)
+        """
+        prices = self.prices
+        self.cash = self.initial_capital
+        self.shares = 0
+        self.entry_price = 0
+        self.entry_day = 0
+        self.entry_commission = 0
+        self.commission_paid = 0
+        self.slippage_cost = 0
+        self.pending = []
+        self.trades = TradeLog()
+
+        strategy.start(self)
+        start_day = strategy.warmup
+        last_day = len(prices) - 1
+        num_recorded = max(last_day - start_day, 0)
+
+        portfolio_values = [0.0] * num_recorded
+        positions = [0] * num_recorded
+        pending = self.pending
+        on_bar = strategy.on_bar
+        submit = pending.extend
+
+        for day in range(start_day, len(prices)):
+            price = prices[day]
+
+            if pending:
+                self._fill_orders(strategy, day, price)
+
+            # Position held after the previous bar's orders were executed
+            if day > start_day:
+                positions[day - start_day - 1] = 1 if self.shares else 0
+            if day == last_day:
+                break
+
+            portfolio_values[day - start_day] = self.cash + self.shares * price
+
+            orders = on_bar(day, price)
+            if orders:
+                submit(orders)
+
+        return self._metrics(portfolio_values, positions)
+
+    def _fill_orders(self, strategy, day, price):
+        for order in list(self.pending):
+            if order not in self.pending:
+                continue  # Cancelled by an earlier fill on this bar
+
+            if not order.triggered(price):
+                continue
+            # Limit and stop sells wait for a position; a market sell with nothing to sell expires
+            if order.side == SELL and not self.shares and order.order_type != MARKET:
+                continue
+
+            self.pending.remove(order)
+            quantity = self._execute(order, day, price)
+            if quantity:
+                orders = strategy.on_fill(order, day, price, quantity)
+                if orders:
+                    self.pending.extend(orders)
+
+    def _execute(self, order, day, price):
+        costs = self.cost_model
+
+        if order.side == BUY:
+            fill_price = price * costs.buy_factor
+            affordable = math.floor((self.cash - costs.commission) / (fill_price * (1 + costs.commission_rate)))
+            if self.share_limits is not None:
+                affordable = min(affordable, int(self.share_limits[day]))
+            quantity = affordable if order.quantity is None else min(order.quantity, affordable)
+            if quantity <= 0:
+                return 0
+
+            if not self.shares:
+                self.entry_day = day
+                self.entry_price = fill_price
+                self.entry_commission = 0
+            else:
+                # Average entry price when adding to a position
+                self.entry_price = (self.entry_price * self.shares + fill_price * quantity) / (self.shares + quantity)
+            commission = costs.commission + quantity * fill_price * costs.commission_rate
+            self.shares += quantity
+            self.cash -= quantity * fill_price + commission
+            self.entry_commission += commission
+            self.commission_paid += commission
+            self.slippage_cost += quantity * (fill_price - price)
+            return quantity
+
+        fill_price = price * costs.sell_factor
+        quantity = self.shares if order.quantity is None else min(order.quantity, self.shares)
+        if quantity <= 0:
+            return 0  # Nothing to sell: the order expires without a fill, commission or trade
+        commission = costs.commission + quantity * fill_price * costs.commission_rate
+        self.cash += quantity * fill_price - commission
+        self.commission_paid += commission
+        self.slippage_cost += quantity * (price - fill_price)
+
+        # The trade carries its share of the entry commission
+        entry_commission = self.entry_commission * quantity / self.shares
+        self.entry_commission -= entry_commission
+        self.shares -= quantity
+
+        self.trades.append(self.entry_day, self.entry_price, day, fill_price, quantity,
+                           order.reason or ("Stop Loss" if order.order_type == STOP else "Sell Signal"),
+                           commission=entry_commission + commission)
+
+        if not self.shares:
+            self.entry_price = 0
+        return quantity
+
+    def _metrics(self, portfolio_values, positions):
+        initial_capital = self.initial_capital
+        prices = self.prices
+        trades = self.trades
+
+        # Running peak (starting from initial capital) and drawdown
+        values = np.array(portfolio_values, dtype=np.float64)
+        peaks = np.maximum.accumulate(np.concatenate(([initial_capital], values)))[1:]
+        drawdowns = (peaks - values) / peaks * 100
+        max_drawdown = max(0, float(drawdowns.max())) if drawdowns.size else 0
+
+        # Open positions are valued at the last price
+        final_portfolio_value = self.cash
+        if self.shares:
+            final_portfolio_value += self.shares * prices[-1]
+
+        # Calculate performance metrics
+        total_return = (final_portfolio_value / initial_capital - 1) * 100
+        trade_stats = trades.summary()
+
+        years = len(prices) / 252  # Standard trading days in a year
+        annualized_return = ((final_portfolio_value / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0
+
+        return {
+            "initial_capital": initial_capital,
+            "final_portfolio_value": final_portfolio_value,
+            "total_return_percent": total_return,
+            "annualized_return_percent": annualized_return,
+            "total_trades": len(trades),
+            "winning_trades": trade_stats["winning_trades"],
+            "losing_trades": len(trades) - trade_stats["winning_trades"],
+            "win_rate_percent": trade_stats["win_rate_percent"],
+            "avg_win": trade_stats["avg_win"],
+            "avg_loss": trade_stats["avg_loss"],
+            "profit_factor": trade_stats["profit_factor"],
+            "max_drawdown_percent": max_drawdown,
+            "trade_history": trades,
+            "portfolio_history": [initial_capital] + portfolio_values,
+            "positions": [0] + positions,
+            "drawdowns": [0] + drawdowns.tolist(),
+            **cost_metrics(self.commission_paid, self.slippage_cost, initial_capital)
+        }
+
+
+class CrossoverStrategy(Strategy):
+    """The moving average crossover with a stop loss, as a Strategy plugin"""
+
+    def __init__(self, short_period=10, long_period=30, stop_loss_percent=5, use_ema=False,
+                 indicators=None, short_ma=None, long_ma=None):
+        """
+        Args:
+            short_period: Period for short-term moving average
+            long_period: Period for long-term moving average
+            stop_loss_percent: Percentage of entry price for stop loss
+            use_ema: Whether to use EMA instead of SMA
+            indicators: Optional IndicatorStore for the prices being backtested
+            short_ma: Optional precalculated short-term MA values
+            long_ma: Optional precalculated long-term MA values
+        """
+        self.short_period = short_period
+        self.long_period = long_period
+        self.stop_loss_percent = stop_loss_percent
+        self.use_ema = use_ema
+        self.indicators = indicators
+        self.short_ma = short_ma
+        self.long_ma = long_ma
+        self.warmup = max(short_period, long_period) - 1
+
+    def start(self, engine):
+        super().start(engine)
+        if self.short_ma is None or self.long_ma is None:
+            if self.indicators is None:
+                self.indicators = IndicatorStore(engine.prices)
+            ma_type = "ema" if self.use_ema else "sma"
+            self.short_ma = self.indicators.get(ma_type, self.short_period)
+            self.long_ma = self.indicators.get(ma_type, self.long_period)
+
+        # Plain floats are much faster to index one bar at a time
+        if isinstance(self.short_ma, np.ndarray):
+            self.short_ma = self.short_ma.tolist()
+        if isinstance(self.long_ma, np.ndarray):
+            self.long_ma = self.long_ma.tolist()
+        self.first_signal_day = max(self.warmup, self.long_period)
+
+    def on_bar(self, day, price):
+        if day < self.first_signal_day:
+            return None
+
+        short_ma, long_ma = self.short_ma, self.long_ma
+        short_ma_current, long_ma_current = short_ma[day], long_ma[day]
+        short_ma_prev, long_ma_prev = short_ma[day - 1], long_ma[day - 1]
+
+        if not self.engine.shares:
+            if short_ma_prev <= long_ma_prev and short_ma_current > long_ma_current:
+                return (Order(BUY),)
+        elif short_ma_prev >= long_ma_prev and short_ma_current < long_ma_current:
+            # The stop order was placed first, so it still wins if the next price also hits it
+            return (Order(SELL, reason="Sell Signal"),)
+        return None
+
+    def on_fill(self, order, day, price, quantity):
+        if order.side == BUY:
+            stop_price = price * (1 - self.stop_loss_percent / 100)
+            return (Order(SELL, order_type=STOP, price=stop_price, reason="Stop Loss"),)
+
+        # Position closed: drop whichever exit order did not fill
+        self.engine.cancel_all()
+        return None
+
+
+# Regression check, parity with backtest_strategy and per-bar throughput benchmark
+if __name__ == "__main__":
+    import time
+    from app import backtest_strategy, generate_price_data
+
+    # A market sell while flat expires: no crash, no commission, no trade
+    class SellWhileFlat(Strategy):
+        def on_bar(self, day, price):
+            return (Order(SELL),) if day == 3 else None
+
+    flat = EventEngine(generate_price_data(days=10, seed=1), cost_model=CostModel(commission=5)).run(SellWhileFlat())
+    assert flat["total_trades"] == 0 and flat["commission_paid"] == 0 and flat["final_portfolio_value"] == 10000
+
+    # The crossover plugin reproduces the loop engine, with and without costs
+    for seed in range(20):
+        prices = generate_price_data(days=1000, volatility=0.02, seed=seed)
+        for cost_model in (None, CostModel(commission=1, commission_percent=0.1, slippage_bps=5)):
+            expected = backtest_strategy(prices, cost_model=cost_model)
+            result = EventEngine(prices, cost_model=cost_model).run(CrossoverStrategy())
+            trades, expected_trades = result["trade_history"], expected["trade_history"]
+            assert len(trades) == len(expected_trades)
+            for column in ("entry_day", "exit_day", "shares", "exit_reason"):
+                assert np.array_equal(getattr(trades, column), getattr(expected_trades, column))
+            for column in ("entry_price", "exit_price", "commission"):
+                assert np.allclose(getattr(trades, column), getattr(expected_trades, column))
+            assert result["positions"] == expected["positions"]
+            assert np.allclose(result["portfolio_history"], expected["portfolio_history"])
+            assert math.isclose(result["final_portfolio_value"], expected["final_portfolio_value"])
+            assert math.isclose(result["commission_paid"], expected["commission_paid"], abs_tol=1e-9)
+
+    num_bars = 1_000_000
+    prices = generate_price_data(days=num_bars, volatility=0.02, seed=7)
+    short_ma, long_ma = IndicatorStore(prices).get("sma", 10), IndicatorStore(prices).get("sma", 30)
+
+    # Engine overhead alone: a strategy that never trades
+    started = time.perf_counter()
+    EventEngine(prices).run(Strategy())
+    empty = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = EventEngine(prices).run(CrossoverStrategy(short_ma=short_ma, long_ma=long_ma))
+    crossover = time.perf_counter() - started
+
+    started = time.perf_counter()
+    backtest_strategy(prices)
+    loop = time.perf_counter() - started
+
+    print("market sell while flat expires without commission or trade; crossover matches backtest_strategy")
+    print(f"{num_bars:,} bars: empty strategy {num_bars / empty:,.0f} bars/sec, "
+          f"crossover {num_bars / crossover:,.0f} bars/sec ({result['total_trades']:,} trades), "
+          f"loop engine {num_bars / loop:,.0f} bars/sec")
@@ -0,0 +1,202 @@
+"""
+Moving Average Indicators
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+O(n) moving average calculations for the backtester: NumPy versions that
+work on a whole price series at once and streaming versions that are
+updated one bar at a time.
+"""
+
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# Running sums are re-anchored at least this often to stop float error building up
+SMA_BLOCK_SIZE = 4096
+SMA_RESYNC_INTERVAL = 4096
+
+
+# Function to calculate the simple moving average of a whole series
+def sma_array(prices, period, block_size=SMA_BLOCK_SIZE):
+    """
+    Calculate the Simple Moving Average with cumulative sums in O(n).
+
+    The cumulative sum is restarted every block_size bars so the rounding
+    error of each window sum stays bounded no matter how long the series is.
+
+    Args:
+        prices: List or array of price data; a 2-D (bars x series) array
+                gives one moving average per column
+        period: Number of bars to include in the moving average
+        block_size: Number of bars covered by each cumulative sum
+
+    Returns:
+        NumPy array of moving averages (NaN for the first period-1 bars)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_bars = len(prices)
+    sma_values = np.full(prices.shape, np.nan)
+
+    if period < 1 or num_bars < period:
+        return sma_values
+
+    block_size = max(block_size, period)
+
+    for start in range(period - 1, num_bars, block_size):
+        stop = min(start + block_size, num_bars)
+
+        # Running total over this block plus the period-1 bars leading into it
+        running_sum = np.cumsum(prices[start - (period - 1):stop], axis=0)
+        window_sums = running_sum[period - 1:].copy()
+        window_sums[1:] -= running_sum[:-period]
+
+        sma_values[start:stop] = window_sums / period
+
+    return sma_values
+
+# Streaming simple moving average
+class RollingSMA:
+    """Simple Moving Average updated in O(1) as each new price arrives"""
+
+    def __init__(self, period, resync_interval=SMA_RESYNC_INTERVAL):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.resync_interval = max(resync_interval, period)
+        self.updates_since_resync = 0
+        self.value = None  # None until a full period of prices has been seen
+
+    def update(self, price):
+        """Add the next price and return the updated average"""
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+
+        self.window.append(price)
+        self.total += price
+        self.updates_since_resync += 1
+
+        # Drift guard: recompute the exact window sum every so often
+        if self.updates_since_resync >= self.resync_interval:
+            self.total = math.fsum(self.window)
+            self.updates_since_resync = 0
+
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+
+        return self.value
+
+# Streaming exponential moving average
+class RollingEMA:
+    """Exponential Moving Average updated in O(1), seeded with the SMA of the first period prices"""
+
+    def __init__(self, period, smoothing=2):
+        self.period = period
+        self.multiplier = smoothing / (period + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = None  # None until a full period of prices has been seen
+
+    def update(self, price):
+        """Add the next price and return the updated average"""
+        self.count += 1
+
+        if self.count < self.period:
+            self.total += price
+        elif self.count == self.period:
+            # First EMA is the SMA of the first period prices
+            self.total += price
+            self.value = self.total / self.period
+        else:
+            self.value = (price - self.value) * self.multiplier + self.value
+
+        return self.value
+
+# Function to calculate the exponential moving average of a whole series
+def ema_array(prices, period, smoothing=2):
+    """
+    Calculate the Exponential Moving Average with the same seeding as calculate_ema.
+
+    The first value is the SMA of the first period prices; the recursion after
+    that runs in pandas' compiled ewm instead of a Python loop.
+
+    Args:
+        prices: List or array of price data; a 2-D (bars x series) array
+                gives one moving average per column
+        period: Number of bars to include in the moving average
+        smoothing: Smoothing factor (default 2)
+
+    Returns:
+        NumPy array of EMA values (NaN for the first period-1 bars)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_bars = len(prices)
+    ema_values = np.full(prices.shape, np.nan)
+
+    if period < 1 or num_bars < period:
+        return ema_values
+
+    seeded = prices[period - 1:].copy()
+    seeded[0] = prices[:period].sum(axis=0) / period
+
+    multiplier = smoothing / (period + 1)
+    frame = pd.DataFrame(seeded) if seeded.ndim == 2 else pd.Series(seeded)
+    ema_values[period - 1:] = frame.ewm(alpha=multiplier, adjust=False).mean().to_numpy()
+
+    return ema_values
+
+# Memoized indicators for one price series
+class IndicatorStore:
+    """
+    Moving averages of a single price series, each calculated at most once.
+
+    Results are cached by (kind, period, smoothing) and returned as read-only
+    NumPy arrays (NaN until the average is established), so every backtest,
+    chart and sweep on the same series can share them safely.
+    """
+
+    KINDS = ("sma", "ema")
+
+    def __init__(self, prices):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self._cache = {}
+        self.computed = 0  # Number of indicators actually calculated
+
+    def get(self, kind, period, smoothing=2):
+        """
+        Return a moving average, calculating it on first use.
+
+        Args:
+            kind: 'sma' or 'ema'
+            period: Moving average period
+            smoothing: EMA smoothing factor (ignored for the SMA)
+
+        Returns:
+            Read-only NumPy array of moving average values
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown moving average type: {kind}")
+
+        key = (kind, int(period), smoothing if kind == "ema" else None)
+        values = self._cache.get(key)
+        if values is None:
+            if kind == "ema":
+                values = ema_array(self.prices, key[1], smoothing)
+            else:
+                values = sma_array(self.prices, key[1])
+            values.flags.writeable = False
+            self._cache[key] = values
+            self.computed += 1
+        return values
+
+    def sma(self, period):
+        """Simple moving average (see get)"""
+        return self.get("sma", period)
+
+    def ema(self, period, smoothing=2):
+        """Exponential moving average (see get)"""
+        return self.get("ema", period, smoothing)
+
+    def __len__(self):
+        return len(self._cache)
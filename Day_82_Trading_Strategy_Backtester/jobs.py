@@ -0,0 +1,229 @@
+"""
+Background Job Queue
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Runs long backtests, sweeps and walk-forward optimizations outside the web
+request. Jobs wait in a bounded queue served by a small pool of worker
+threads, report their progress while they run and can be cancelled. Every
+job and its finished result are stored in SQLite, so results survive a
+restart and jobs that were interrupted are queued again.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    result BLOB,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the queue already holds its maximum number of unfinished jobs"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job (by its progress callback) once it is cancelled"""
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs with SQLite persistence.
+
+    A handler is called as handler(params, progress) and returns the
+    serialised result (bytes or str). It should call progress(done, total)
+    from time to time: that updates the job's progress and raises
+    JobCancelled once the job has been cancelled, which is how running jobs
+    stop. Any other exception marks the job as failed with its message.
+    """
+
+    def __init__(self, db_path, handlers, max_workers=2, max_pending=32):
+        """
+        Args:
+            db_path: Path of the SQLite database file
+            handlers: Dictionary mapping job kinds to handler functions
+            max_workers: Number of jobs run at the same time
+            max_pending: Largest number of queued and running jobs
+        """
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._active = {}  # Unfinished jobs: id -> {"progress", "cancelled", "future"}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backtest-job")
+        self._resume()
+
+    def submit(self, kind, params):
+        """
+        Queue a job.
+
+        Args:
+            kind: Job kind (a key of handlers)
+            params: JSON-serialisable parameters passed to the handler
+
+        Returns:
+            Job id
+
+        Raises:
+            ValueError: For an unknown job kind
+            QueueFullError: When max_pending jobs are already queued or running
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if len(self._active) >= self.max_pending:
+                raise QueueFullError(f"The job queue is full ({self.max_pending} unfinished jobs)")
+            self._db.execute("INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                             (job_id, kind, json.dumps(params), QUEUED, time.time()))
+            self._start(job_id, kind, params)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Dictionary with id, kind, status, progress (0 to 1), error,
+            result (bytes once done) and the created/started/finished times,
+            or None for an unknown id
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, status, progress, error, result, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            active = self._active.get(job_id)
+            progress = active["progress"] if active else None
+        if row is None:
+            return None
+
+        job = dict(zip(("id", "kind", "status", "progress", "error", "result",
+                        "created_at", "started_at", "finished_at"), row))
+        if progress is not None and job["status"] == RUNNING:
+            job["progress"] = progress  # Live progress is only written to the database at the end
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. A queued job is dropped at once; a running job stops at
+        its next progress report.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            True if the job was still unfinished
+        """
+        with self._lock:
+            active = self._active.get(job_id)
+            if active is None:
+                return False
+            active["cancelled"] = True
+            if active["future"].cancel():
+                # It never started, so no worker will record the cancellation
+                del self._active[job_id]
+                self._finish(job_id, CANCELLED, 0.0)
+        return True
+
+    def stats(self):
+        """Counts of unfinished jobs and the queue limits"""
+        with self._lock:
+            running = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+            return {
+                "queued": len(self._active) - running,
+                "running": running,
+                "max_pending": self.max_pending,
+                "workers": self.max_workers
+            }
+
+    def shutdown(self, wait=True):
+        """Cancel queued jobs and stop the workers (running jobs are queued again on restart)"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _start(self, job_id, kind, params):
+        # Called with the lock held
+        self._active[job_id] = {"progress": 0.0, "cancelled": False, "future": None}
+        self._active[job_id]["future"] = self._executor.submit(self._run, job_id, kind, params)
+
+    def _resume(self):
+        # Jobs left queued or running by a previous process are queued again
+        with self._lock:
+            rows = self._db.execute("SELECT id, kind, params FROM jobs WHERE status IN (?, ?) "
+                                    "ORDER BY created_at", (QUEUED, RUNNING)).fetchall()
+            for job_id, kind, params in rows:
+                self._db.execute("UPDATE jobs SET status = ?, progress = 0, started_at = NULL WHERE id = ?",
+                                 (QUEUED, job_id))
+                if kind in self.handlers:
+                    self._start(job_id, kind, json.loads(params))
+                else:
+                    self._finish(job_id, FAILED, 0.0, error=f"Unknown job kind '{kind}'")
+
+    def _run(self, job_id, kind, params):
+        with self._lock:
+            active = self._active[job_id]
+            if active["cancelled"]:
+                del self._active[job_id]
+                self._finish(job_id, CANCELLED, 0.0)
+                return
+            self._db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                             (RUNNING, time.time(), job_id))
+
+        def progress(done, total):
+            if active["cancelled"]:
+                raise JobCancelled()
+            active["progress"] = done / total if total else 1.0
+
+        try:
+            result = self.handlers[kind](params, progress)
+        except JobCancelled:
+            status, error, result = CANCELLED, None, None
+        except Exception as e:
+            status, error, result = FAILED, str(e) or type(e).__name__, None
+        else:
+            status, error = DONE, None
+
+        with self._lock:
+            del self._active[job_id]
+            self._finish(job_id, status, 1.0 if status == DONE else active["progress"], error, result)
+
+    def _finish(self, job_id, status, progress, error=None, result=None):
+        # Called with the lock held
+        if isinstance(result, str):
+            result = result.encode("utf-8")
+        self._db.execute("UPDATE jobs SET status = ?, progress = ?, error = ?, result = ?, finished_at = ? "
+                         "WHERE id = ?", (status, progress, error, result, time.time(), job_id))
@@ -0,0 +1,225 @@
+"""
+Monte Carlo Strategy Robustness Testing
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Runs the moving average crossover strategy over thousands of simulated price
+paths at once. Every path is simulated in lock-step: the loop walks the bars
+once and each step updates all paths with array operations, so the cost grows
+with the number of bars rather than the number of paths.
+"""
+
+import numpy as np
+from indicators import sma_array, ema_array
+from vectorized_backtest import crossover_signals
+
+# Percentiles reported for each metric distribution
+DISTRIBUTION_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Bars simulated between two progress reports
+PROGRESS_INTERVAL = 64
+
+
+# Function to backtest the crossover strategy on many paths at once
+def backtest_paths(paths, short_period=10, long_period=30, initial_capital=10000,
+                   stop_loss_percent=5, use_ema=False, chunk_size=2048, progress=None):
+    """
+    Backtest the crossover strategy on every price path in one batch.
+
+    Applies exactly the rules of backtest_strategy (next-bar execution,
+    whole shares, stop loss checked against the next bar) to each path.
+
+    Args:
+        paths: 2-D array of prices with shape (n_paths, days)
+        short_period: Period for short-term moving average
+        long_period: Period for long-term moving average
+        initial_capital: Starting capital amount
+        stop_loss_percent: Percentage of entry price for stop loss
+        use_ema: Whether to use EMA instead of SMA
+        chunk_size: Number of paths simulated together
+        progress: Optional callback called as progress(done, total) every
+                  PROGRESS_INTERVAL bars, counting path-bars; an exception
+                  raised by it stops the run
+
+    Returns:
+        Dictionary of per-path metric arrays (total return, max drawdown,
+        win rate, profit factor and trade count)
+    """
+    paths = np.asarray(paths)
+    n_paths, num_bars = paths.shape
+
+    metrics = {
+        "total_return_percent": np.zeros(n_paths),
+        "max_drawdown_percent": np.zeros(n_paths),
+        "win_rate_percent": np.zeros(n_paths),
+        "profit_factor": np.zeros(n_paths),
+        "total_trades": np.zeros(n_paths, dtype=np.int64)
+    }
+
+    for start in range(0, n_paths, chunk_size):
+        # Bars-first layout keeps each simulation step on contiguous memory
+        prices = np.ascontiguousarray(paths[start:start + chunk_size].T, dtype=np.float64)
+        chunk_progress = None
+        if progress is not None:
+            def chunk_progress(day, start=start, size=prices.shape[1]):
+                progress(start * num_bars + day * size, n_paths * num_bars)
+        chunk_metrics = _simulate_chunk(prices, short_period, long_period, initial_capital,
+                                        stop_loss_percent, use_ema, chunk_progress)
+        for key, values in chunk_metrics.items():
+            metrics[key][start:start + chunk_size] = values
+
+    return metrics
+
+# Function to simulate one chunk of paths bar by bar
+def _simulate_chunk(prices, short_period, long_period, initial_capital, stop_loss_percent, use_ema,
+                    progress=None):
+    num_bars, n_paths = prices.shape
+    ma_array = ema_array if use_ema else sma_array
+
+    start_day = max(short_period, long_period) - 1
+    last_day = num_bars - 1
+    first_signal_day = max(start_day, long_period)
+    buy_signals, sell_signals = crossover_signals(ma_array(prices, short_period),
+                                                  ma_array(prices, long_period),
+                                                  first_signal_day, last_day)
+
+    # Account state for every path
+    capital = np.full(n_paths, float(initial_capital))
+    shares = np.zeros(n_paths)
+    entry_price = np.zeros(n_paths)
+    stop_loss_price = np.zeros(n_paths)
+    max_portfolio_value = capital.copy()
+    max_drawdown = np.zeros(n_paths)
+
+    # Trade statistics for every path
+    trade_count = np.zeros(n_paths, dtype=np.int64)
+    win_count = np.zeros(n_paths, dtype=np.int64)
+    gross_profit = np.zeros(n_paths)
+    gross_loss = np.zeros(n_paths)
+
+    stop_factor = 1 - stop_loss_percent / 100
+
+    for day in range(start_day, last_day):
+        if progress is not None and day % PROGRESS_INTERVAL == 0:
+            progress(day)
+
+        current_price = prices[day]
+        next_day_price = prices[day + 1]
+        in_position = shares > 0
+
+        # Portfolio value and drawdown
+        portfolio_value = capital + shares * current_price
+        np.maximum(max_portfolio_value, portfolio_value, out=max_portfolio_value)
+        np.maximum(max_drawdown, (max_portfolio_value - portfolio_value) / max_portfolio_value * 100,
+                   out=max_drawdown)
+
+        if day < first_signal_day:
+            continue
+
+        # Buy where a buy signal fires and we are flat
+        buying = buy_signals[day] & ~in_position
+        if buying.any():
+            new_shares = np.floor(capital[buying] / next_day_price[buying])
+            filled = np.flatnonzero(buying)[new_shares > 0]
+            new_shares = new_shares[new_shares > 0]
+
+            entry_price[filled] = next_day_price[filled]
+            capital[filled] -= new_shares * entry_price[filled]
+            shares[filled] = new_shares
+            stop_loss_price[filled] = entry_price[filled] * stop_factor
+
+        # Sell where a sell signal fires or the stop loss is hit
+        selling = in_position & (sell_signals[day] | (next_day_price <= stop_loss_price))
+        if selling.any():
+            exit_price = next_day_price[selling]
+            capital[selling] += shares[selling] * exit_price
+            profit_loss = (exit_price - entry_price[selling]) * shares[selling]
+
+            trade_count[selling] += 1
+            win_count[selling] += profit_loss > 0
+            gross_profit[selling] += np.where(profit_loss > 0, profit_loss, 0)
+            gross_loss[selling] -= np.where(profit_loss < 0, profit_loss, 0)
+
+            shares[selling] = 0
+            entry_price[selling] = 0
+            stop_loss_price[selling] = 0
+
+    final_portfolio_value = capital + shares * prices[-1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(trade_count > 0, win_count / trade_count * 100, 0)
+        profit_factor = np.where(gross_loss > 0, gross_profit / gross_loss, np.inf)
+
+    return {
+        "total_return_percent": (final_portfolio_value / initial_capital - 1) * 100,
+        "max_drawdown_percent": max_drawdown,
+        "win_rate_percent": win_rate,
+        "profit_factor": profit_factor,
+        "total_trades": trade_count
+    }
+
+# Function to summarize the distribution of one metric
+def summarize_distribution(values, bins=20):
+    """
+    Summarize a metric across simulated paths.
+
+    Args:
+        values: Array with one metric value per path
+        bins: Number of histogram bins
+
+    Returns:
+        Dictionary with mean, standard deviation, percentiles and histogram.
+        Infinite values (e.g. profit factor with no losing trades) are
+        counted separately and left out of the statistics.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+
+    if finite.size == 0:
+        return {"mean": None, "std": None, "percentiles": {}, "histogram": {"counts": [], "edges": []},
+                "infinite_count": int(values.size)}
+
+    counts, edges = np.histogram(finite, bins=bins)
+
+    return {
+        "mean": float(finite.mean()),
+        "std": float(finite.std()),
+        "percentiles": {f"p{p}": float(v) for p, v in
+                        zip(DISTRIBUTION_PERCENTILES, np.percentile(finite, DISTRIBUTION_PERCENTILES))},
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        "infinite_count": int(values.size - finite.size)
+    }
+
+# Function to run a full Monte Carlo robustness test
+def run_monte_carlo(paths, short_period=10, long_period=30, initial_capital=10000,
+                    stop_loss_percent=5, use_ema=False, bins=20, progress=None):
+    """
+    Backtest the strategy on every path and summarize the outcome distribution.
+
+    Args:
+        paths: 2-D array of prices with shape (n_paths, days)
+        short_period: Period for short-term moving average
+        long_period: Period for long-term moving average
+        initial_capital: Starting capital amount
+        stop_loss_percent: Percentage of entry price for stop loss
+        use_ema: Whether to use EMA instead of SMA
+        bins: Number of histogram bins per metric
+        progress: Optional progress(done, total) callback (see backtest_paths)
+
+    Returns:
+        Dictionary with the probability of a loss and the distribution of
+        total return, max drawdown, win rate and profit factor
+    """
+    metrics = backtest_paths(paths, short_period, long_period, initial_capital,
+                             stop_loss_percent, use_ema, progress=progress)
+
+    return {
+        "n_paths": int(len(metrics["total_return_percent"])),
+        "probability_of_loss": float(np.mean(metrics["total_return_percent"] < 0)),
+        "avg_trades": float(np.mean(metrics["total_trades"])),
+        "distributions": {
+            key: summarize_distribution(metrics[key], bins)
+            for key in ("total_return_percent", "max_drawdown_percent",
+                        "win_rate_percent", "profit_factor")
+        }
+    }
@@ -0,0 +1,288 @@
+"""
+Strategy Parameter Optimizer
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Grid search over moving average crossover parameters. Every distinct moving
+average is calculated once per price series and shared by all combinations
+that use it; each combination is then run through the vectorized engine,
+either serially or across a pool of worker processes.
+"""
+
+import os
+import math
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from indicators import IndicatorStore
+from vectorized_backtest import backtest_vectorized
+
+# Metrics where a smaller value ranks higher
+ASCENDING_METRICS = ("max_drawdown_percent",)
+
+# Largest grid accepted in a single sweep
+MAX_GRID_SIZE = 10000
+
+# History series dropped from results unless explicitly requested
+HISTORY_KEYS = ("portfolio_history", "positions", "drawdowns")
+
+# Per-process state for pool workers (set up once by _init_worker)
+_worker_memory = None
+_worker_indicators = None
+_worker_volume = None
+
+
+# Function to expand a parameter range description into a list of values
+def expand_range(value):
+    """
+    Expand a parameter specification into a list of values.
+
+    Args:
+        value: A single value, a list of values, or a dict with
+               "start", "stop" (inclusive) and optional "step"
+
+    Returns:
+        List of parameter values
+    """
+    if isinstance(value, dict):
+        start = value["start"]
+        stop = value["stop"]
+        step = value.get("step", 1)
+        if step <= 0:
+            raise ValueError("Range step must be positive")
+        count = int(round((stop - start) / step)) + 1
+        return [start + i * step for i in range(max(count, 0))]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+# Function to run one backtest configuration
+def run_config(indicators, config, keep_history=False, volume=None):
+    """
+    Run a single backtest configuration with shared moving averages.
+
+    The MAs are calculated over the full series and sliced, so a config with
+    a "start"/"end" bar range reuses the same indicators as every other window.
+
+    Args:
+        indicators: IndicatorStore for the price series
+        config: Dictionary with short_period, long_period and optional
+                stop_loss, ma_type, initial_capital, cost_model (CostModel),
+                start, end and close_at_end (see backtest_vectorized)
+        keep_history: Whether to keep the per-bar history series
+        volume: Optional bar volumes for the cost model's participation cap
+
+    Returns:
+        Dictionary containing performance metrics
+    """
+    prices = indicators.prices
+    ma_type = config.get("ma_type", "sma")
+    start = config.get("start", 0)
+    end = config.get("end", len(prices))
+    short_ma = indicators.get(ma_type, config["short_period"])
+    long_ma = indicators.get(ma_type, config["long_period"])
+
+    results = backtest_vectorized(
+        prices[start:end],
+        short_ma[start:end],
+        long_ma[start:end],
+        short_period=config["short_period"],
+        long_period=config["long_period"],
+        initial_capital=config.get("initial_capital", 10000),
+        stop_loss_percent=config.get("stop_loss", 5),
+        cost_model=config.get("cost_model"),
+        volume=volume[start:end] if volume is not None else None,
+        close_at_end=config.get("close_at_end", False)
+    )
+
+    if not keep_history:
+        for key in HISTORY_KEYS:
+            del results[key]
+
+    return results
+
+# Pool initializer: attach to the shared price (and volume) arrays once per worker process
+def _init_worker(memory_name, num_bars, has_volume):
+    global _worker_memory, _worker_indicators, _worker_volume
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    columns = np.ndarray((2 if has_volume else 1, num_bars), dtype=np.float64, buffer=_worker_memory.buf)
+    _worker_indicators = IndicatorStore(columns[0])
+    _worker_volume = columns[1] if has_volume else None
+
+# Pool task: run one config against the shared prices
+def _run_worker_config(config, keep_history):
+    return run_config(_worker_indicators, config, keep_history, _worker_volume)
+
+# Function to run many backtest configurations, optionally in parallel
+def run_backtests(prices, configs, max_workers=1, keep_history=False, indicators=None, volume=None,
+                  progress=None):
+    """
+    Run a list of backtest configurations and return their metrics in order.
+
+    With more than one worker the configs are spread over a process pool. The
+    price array is copied into shared memory once and every worker maps it
+    directly, so it is never pickled per task.
+
+    Args:
+        prices: List or array of historical prices
+        configs: List of config dictionaries (see run_config)
+        max_workers: Number of processes (1 runs serially in this process)
+        keep_history: Whether to keep the per-bar history series
+        indicators: Optional IndicatorStore for prices to reuse (serial runs)
+        volume: Optional bar volumes for the cost model's participation cap
+        progress: Optional callback called as progress(done, total) after each
+                  result; an exception raised by it stops the run
+
+    Returns:
+        List of metrics dictionaries, one per config, in the same order
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if volume is not None:
+        volume = np.asarray(volume, dtype=np.float64)
+    max_workers = max(1, min(max_workers or os.cpu_count(), os.cpu_count() or 1, len(configs)))
+
+    if max_workers == 1:
+        if indicators is None:
+            indicators = IndicatorStore(prices)
+        if progress is None:
+            return [run_config(indicators, config, keep_history, volume) for config in configs]
+
+        results = []
+        for config in configs:
+            results.append(run_config(indicators, config, keep_history, volume))
+            progress(len(results), len(configs))
+        return results
+
+    # Prices (and volumes) go into shared memory as the rows of one array
+    columns = [prices] if volume is None else [prices, volume]
+    memory = shared_memory.SharedMemory(create=True, size=max(prices.nbytes * len(columns), 1))
+    try:
+        np.ndarray((len(columns), len(prices)), dtype=np.float64, buffer=memory.buf)[:] = columns
+
+        # A few chunks per worker keeps task overhead low while balancing load
+        chunksize = max(1, math.ceil(len(configs) / (max_workers * 4)))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(memory.name, len(prices), volume is not None)) as executor:
+            results = executor.map(_run_worker_config, configs,
+                                   [keep_history] * len(configs), chunksize=chunksize)
+            if progress is None:
+                return list(results)
+
+            collected = []
+            try:
+                for result in results:
+                    collected.append(result)
+                    progress(len(collected), len(configs))
+            except BaseException:
+                # Drop the chunks that have not started instead of waiting for them
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            return collected
+    finally:
+        memory.close()
+        memory.unlink()
+
+# Function to run a grid search over strategy parameters
+def sweep(prices, short_periods, long_periods, stop_losses=(5,), ma_types=("sma",),
+          initial_capital=10000, sort_by="total_return_percent", max_workers=1, indicators=None,
+          cost_model=None, volume=None, progress=None):
+    """
+    Backtest every combination of the given parameters on one price series.
+
+    Args:
+        prices: List or array of historical prices
+        short_periods: Short MA periods to test (value, list or range dict)
+        long_periods: Long MA periods to test (value, list or range dict)
+        stop_losses: Stop loss percentages to test (value, list or range dict)
+        ma_types: MA types to test ('sma' and/or 'ema')
+        initial_capital: Starting capital amount
+        sort_by: Metric used to rank the results
+        max_workers: Number of processes to spread the grid over
+        indicators: Optional IndicatorStore for prices to reuse (serial runs)
+        cost_model: Optional CostModel applied to every combination
+        volume: Optional bar volumes for the cost model's participation cap
+        progress: Optional progress(done, total) callback (see run_backtests)
+
+    Returns:
+        List of result rows ranked best first
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    short_periods = [int(p) for p in expand_range(short_periods)]
+    long_periods = [int(p) for p in expand_range(long_periods)]
+    stop_losses = [float(s) for s in expand_range(stop_losses)]
+    ma_types = expand_range(ma_types)
+
+    # Only combinations where the short MA is shorter than the long MA make sense
+    configs = [{"ma_type": ma_type, "short_period": short_period, "long_period": long_period,
+                "stop_loss": stop_loss, "initial_capital": initial_capital, "cost_model": cost_model}
+               for ma_type, short_period, long_period, stop_loss
+               in product(ma_types, short_periods, long_periods, stop_losses)
+               if short_period < long_period <= len(prices)]
+
+    if len(configs) > MAX_GRID_SIZE:
+        raise ValueError(f"Grid has {len(configs)} combinations (maximum is {MAX_GRID_SIZE})")
+
+    rows = []
+    for config, results in zip(configs, run_backtests(prices, configs, max_workers, indicators=indicators,
+                                                         volume=volume, progress=progress)):
+        rows.append({
+            "ma_type": config["ma_type"],
+            "short_period": config["short_period"],
+            "long_period": config["long_period"],
+            "stop_loss": config["stop_loss"],
+            "total_return_percent": results["total_return_percent"],
+            "max_drawdown_percent": results["max_drawdown_percent"],
+            "profit_factor": results["profit_factor"],
+            "win_rate_percent": results["win_rate_percent"],
+            "total_trades": results["total_trades"],
+            "total_costs": results["total_costs"]
+        })
+
+    return rank_results(rows, sort_by)
+
+# Function to rank sweep results
+def rank_results(rows, sort_by="total_return_percent"):
+    """
+    Sort result rows best first and number them.
+
+    Args:
+        rows: List of result dictionaries
+        sort_by: Metric to rank by
+
+    Returns:
+        The sorted list, with a 1-based "rank" added to each row
+    """
+    rows.sort(key=lambda row: row[sort_by], reverse=sort_by not in ASCENDING_METRICS)
+
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+
+    return rows
+
+
+# Benchmark: the same grid serially and on process pools of increasing size
+if __name__ == "__main__":
+    import time
+    from app import generate_price_data
+
+    prices = np.array(generate_price_data(days=200_000, volatility=0.02, seed=4))
+    grid = {"short_periods": {"start": 5, "stop": 25, "step": 5}, "long_periods": [50, 100, 200],
+            "stop_losses": [3, 5], "ma_types": ["sma", "ema"]}
+
+    started = time.perf_counter()
+    serial = sweep(prices, max_workers=1, **grid)
+    serial_time = time.perf_counter() - started
+    print(f"{len(serial)} configs on {len(prices):,} bars, {os.cpu_count()} CPU(s)")
+    print(f"serial:    {serial_time:6.2f} s")
+
+    # run_backtests caps the pool at the CPU count, so only sizes the machine can use are timed
+    worker_counts = [count for count in (2, 4, 8, 16) if count <= (os.cpu_count() or 1)]
+    for workers in worker_counts:
+        started = time.perf_counter()
+        pooled = sweep(prices, max_workers=workers, **grid)
+        pooled_time = time.perf_counter() - started
+        assert pooled == serial
+        print(f"{workers:2d} workers: {pooled_time:6.2f} s ({serial_time / pooled_time:.2f}x); same results as serial")
+    if not worker_counts:
+        print("single CPU: sweeps run serially, so there is no pool speedup to measure here")
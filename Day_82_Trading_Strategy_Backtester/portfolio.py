@@ -0,0 +1,189 @@
+"""
+Portfolio Backtest Engine
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Runs the moving average crossover strategy across a whole universe of symbols
+that share one cash pool. Moving averages and crossover signals are computed
+for every symbol at once on a (bars x symbols) price matrix; the bar loop then
+settles exits and entries for all symbols with array operations, limiting each
+new position to a share of the portfolio's equity.
+"""
+
+import math
+import numpy as np
+from indicators import IndicatorStore
+from vectorized_backtest import crossover_signals
+from trade_log import TradeLog
+
+
+# Function to build per-symbol statistics from a list of trades
+def summarize_symbol(trades):
+    """
+    Trade statistics for a single symbol, using the same keys as backtest_strategy.
+
+    Args:
+        trades: TradeLog of the symbol's trades
+
+    Returns:
+        Dictionary of trade metrics and the symbol's trade history
+    """
+    trade_stats = trades.summary()
+
+    return {
+        "total_trades": len(trades),
+        "winning_trades": trade_stats["winning_trades"],
+        "losing_trades": len(trades) - trade_stats["winning_trades"],
+        "win_rate_percent": trade_stats["win_rate_percent"],
+        "avg_win": trade_stats["avg_win"],
+        "avg_loss": trade_stats["avg_loss"],
+        "profit_factor": trade_stats["profit_factor"],
+        "total_profit_loss": float(trades.profit_loss.sum()),
+        "trade_history": trades
+    }
+
+# Main portfolio backtesting function
+def backtest_portfolio(prices, short_period=10, long_period=30, initial_capital=100000,
+                       stop_loss_percent=5, max_allocation_percent=10, use_ema=False,
+                       symbols=None, indicators=None):
+    """
+    Backtest the crossover strategy on many symbols sharing one pool of cash.
+
+    Each symbol follows the rules of backtest_strategy (next-bar execution,
+    whole shares, stop loss checked against the next bar). On every bar the
+    exits are settled first so their cash is available to new entries; entries
+    are then filled in column order, each sized to at most
+    max_allocation_percent of the current portfolio equity and never more
+    than the cash left.
+
+    Args:
+        prices: 2-D array of prices with shape (bars, symbols); must be finite
+        short_period: Period for short-term moving average
+        long_period: Period for long-term moving average
+        initial_capital: Starting capital shared by all symbols
+        stop_loss_percent: Percentage of entry price for stop loss
+        max_allocation_percent: Largest position per symbol as a percentage of
+                                equity (one value, or one per symbol)
+        use_ema: Whether to use EMA instead of SMA
+        symbols: Optional symbol names (defaults to the column numbers)
+        indicators: Optional IndicatorStore for prices, to reuse its MAs
+
+    Returns:
+        Dictionary with the backtest_strategy metrics for the whole portfolio
+        (trades carry a "symbol" key and positions count open positions) and
+        a "symbols" dictionary of per-symbol trade metrics
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2:
+        raise ValueError("prices must be a 2-D (bars x symbols) array")
+    if not np.isfinite(prices).all():
+        raise ValueError("prices must not contain NaN or infinite values")
+
+    num_bars, num_symbols = prices.shape
+    symbols = list(symbols) if symbols is not None else list(range(num_symbols))
+    if len(symbols) != num_symbols:
+        raise ValueError("symbols must have one name per price column")
+
+    allocation = np.broadcast_to(np.asarray(max_allocation_percent, dtype=np.float64) / 100,
+                                 (num_symbols,))
+
+    # Moving averages and crossover signals for every symbol at once
+    if indicators is None:
+        indicators = IndicatorStore(prices)
+    ma_type = "ema" if use_ema else "sma"
+    short_ma = indicators.get(ma_type, short_period)
+    long_ma = indicators.get(ma_type, long_period)
+
+    start_day = max(short_period, long_period) - 1
+    last_day = num_bars - 1
+    first_signal_day = max(start_day, long_period)
+    buy_signals, sell_signals = crossover_signals(short_ma, long_ma, first_signal_day, last_day)
+
+    # Account state, one slot per symbol
+    cash = float(initial_capital)
+    shares = np.zeros(num_symbols)
+    entry_prices = np.zeros(num_symbols)
+    entry_days = np.zeros(num_symbols, dtype=np.int64)
+    stop_prices = np.zeros(num_symbols)
+
+    trades = TradeLog(symbols=symbols)
+    symbol_trades = [TradeLog(symbols=symbols) for _ in range(num_symbols)]
+    simulated_days = max(last_day - start_day, 0)
+    portfolio_values = np.empty(simulated_days)
+    open_positions = np.empty(simulated_days, dtype=np.int64)
+
+    for step, day in enumerate(range(start_day, last_day)):
+        next_prices = prices[day + 1]
+
+        # Mark to market at this bar's close
+        equity = cash + float(shares @ prices[day])
+        portfolio_values[step] = equity
+
+        held = shares > 0
+        exits = held & (sell_signals[day] | (next_prices <= stop_prices))
+
+        for symbol in np.flatnonzero(exits):
+            exit_price = float(next_prices[symbol])
+            entry_price = float(entry_prices[symbol])
+            position = int(shares[symbol])
+            cash += position * exit_price
+
+            exit_reason = "Stop Loss" if exit_price <= stop_prices[symbol] else "Sell Signal"
+            trades.append(entry_days[symbol], entry_price, day + 1, exit_price, position, exit_reason, symbol)
+            symbol_trades[symbol].append(entry_days[symbol], entry_price, day + 1, exit_price, position,
+                                         exit_reason, symbol)
+
+        shares[exits] = 0
+        stop_prices[exits] = 0
+
+        # Symbols that just exited wait for the next signal, as in backtest_strategy
+        for symbol in np.flatnonzero(buy_signals[day] & ~held):
+            entry_price = float(next_prices[symbol])
+            budget = min(allocation[symbol] * equity, cash)
+            position = math.floor(budget / entry_price)
+            if position <= 0:
+                continue
+
+            cash -= position * entry_price
+            shares[symbol] = position
+            entry_prices[symbol] = entry_price
+            entry_days[symbol] = day + 1
+            stop_prices[symbol] = entry_price * (1 - stop_loss_percent / 100)
+
+        open_positions[step] = np.count_nonzero(shares)
+
+    # Running peak (starting from initial capital) and drawdown
+    peaks = np.maximum.accumulate(np.concatenate(([initial_capital], portfolio_values)))[1:]
+    drawdowns = (peaks - portfolio_values) / peaks * 100
+    max_drawdown = max(0, float(drawdowns.max())) if drawdowns.size else 0
+
+    # Open positions are valued at the last price
+    final_portfolio_value = cash + float(shares @ prices[-1])
+
+    # Calculate performance metrics
+    total_return = (final_portfolio_value / initial_capital - 1) * 100
+    trade_stats = trades.summary()
+
+    years = num_bars / 252  # Standard trading days in a year
+    annualized_return = ((final_portfolio_value / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0
+
+    return {
+        "initial_capital": initial_capital,
+        "final_portfolio_value": final_portfolio_value,
+        "total_return_percent": total_return,
+        "annualized_return_percent": annualized_return,
+        "total_trades": len(trades),
+        "winning_trades": trade_stats["winning_trades"],
+        "losing_trades": len(trades) - trade_stats["winning_trades"],
+        "win_rate_percent": trade_stats["win_rate_percent"],
+        "avg_win": trade_stats["avg_win"],
+        "avg_loss": trade_stats["avg_loss"],
+        "profit_factor": trade_stats["profit_factor"],
+        "max_drawdown_percent": max_drawdown,
+        "trade_history": trades,
+        "portfolio_history": np.concatenate(([initial_capital], portfolio_values)),
+        "positions": np.concatenate(([0], open_positions)),
+        "drawdowns": np.concatenate(([0.0], drawdowns)),
+        "symbols": {symbol: summarize_symbol(symbol_trades[index])
+                    for index, symbol in enumerate(symbols)}
+    }
@@ -0,0 +1,173 @@
+"""
+Request Stage Timings
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+A lightweight profiling layer for the API. A StageTimer measures the wall
+time of each stage of a request (price loading, moving averages, the
+simulation, chart building, JSON encoding, ...) and, when asked to, the
+number of memory blocks each stage left allocated. Every finished request
+adds its stage times to a StageMetrics registry, which keeps a window of
+recent samples per stage and reports p50/p95/p99 latencies for /metrics.
+
+Timing a stage costs two perf_counter() calls; allocation counting is only
+switched on for requests that ask for their timings.
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# Percentiles reported for every stage
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageTimer:
+    """Wall time (and optionally allocations) of the stages of one request"""
+
+    __slots__ = ("endpoint", "count_allocations", "stages", "_name", "_started", "_blocks", "_created")
+
+    def __init__(self, endpoint, count_allocations=False):
+        """
+        Args:
+            endpoint: Name the stage times are aggregated under
+            count_allocations: Also record the memory blocks allocated per stage
+        """
+        self.endpoint = endpoint
+        self.count_allocations = count_allocations
+        self.stages = {}  # Stage name -> [seconds, allocated blocks or None]
+        self._name = None
+        self._started = 0.0
+        self._blocks = 0
+        self._created = time.perf_counter()
+
+    def stage(self, name):
+        """
+        Time a stage: use as `with timer.stage("simulate"):`. Repeated stages
+        with the same name are added up.
+        """
+        self._name = name
+        return self
+
+    def __enter__(self):
+        if self.count_allocations:
+            self._blocks = sys.getallocatedblocks()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._started
+        blocks = sys.getallocatedblocks() - self._blocks if self.count_allocations else None
+
+        entry = self.stages.get(self._name)
+        if entry is None:
+            self.stages[self._name] = [elapsed, blocks]
+        else:
+            entry[0] += elapsed
+            if blocks is not None:
+                entry[1] += blocks
+        return False
+
+    def total(self):
+        """Seconds since the timer was created"""
+        return time.perf_counter() - self._created
+
+    def report(self):
+        """
+        Stage timings for a response.
+
+        Returns:
+            Dictionary mapping each stage (and "total") to its milliseconds
+            and, when counted, the net number of memory blocks it allocated
+        """
+        report = {}
+        for name, (elapsed, blocks) in self.stages.items():
+            report[name] = {"ms": elapsed * 1000}
+            if blocks is not None:
+                report[name]["allocated_blocks"] = blocks
+        report["total"] = {"ms": self.total() * 1000}
+        return report
+
+
+class StageMetrics:
+    """Thread-safe registry of recent stage latencies per endpoint"""
+
+    def __init__(self, window=2048):
+        """
+        Args:
+            window: Number of recent samples kept per endpoint and stage
+        """
+        self.window = window
+        self._samples = {}  # (endpoint, stage) -> deque of seconds
+        self._counts = {}  # (endpoint, stage) -> [count, total seconds]
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        """Add the stage times of a finished request (and its total time)"""
+        stages = [(name, entry[0]) for name, entry in timer.stages.items()]
+        stages.append(("total", timer.total()))
+
+        with self._lock:
+            for name, elapsed in stages:
+                key = (timer.endpoint, name)
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self.window)
+                    self._counts[key] = [0, 0.0]
+                samples.append(elapsed)
+                counts = self._counts[key]
+                counts[0] += 1
+                counts[1] += elapsed
+
+    def summary(self):
+        """
+        Latency percentiles per endpoint and stage.
+
+        Returns:
+            Dictionary {endpoint: {stage: {"count", "sum_ms", "p50_ms",
+            "p95_ms", "p99_ms"}}}; counts and sums cover every request, the
+            percentiles the most recent window of them
+        """
+        with self._lock:
+            snapshot = {key: (np.array(samples), *self._counts[key]) for key, samples in self._samples.items()}
+
+        summary = {}
+        for (endpoint, stage), (samples, count, total) in sorted(snapshot.items()):
+            percentiles = np.quantile(samples, QUANTILES) * 1000
+            summary.setdefault(endpoint, {})[stage] = {
+                "count": count,
+                "sum_ms": total * 1000,
+                **{f"p{round(q * 100)}_ms": float(value) for q, value in zip(QUANTILES, percentiles)}
+            }
+        return summary
+
+    def prometheus(self, prefix="backtest"):
+        """
+        The summary in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Text with one summary metric of stage latencies in seconds
+        """
+        name = f"{prefix}_stage_seconds"
+        lines = [f"# HELP {name} Wall time of API request stages",
+                 f"# TYPE {name} summary"]
+        for endpoint, stages in self.summary().items():
+            for stage, stats in stages.items():
+                labels = f'endpoint="{endpoint}",stage="{stage}"'
+                for q in QUANTILES:
+                    value = stats[f"p{round(q * 100)}_ms"] / 1000
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.9g}')
+                lines.append(f"{name}_sum{{{labels}}} {stats['sum_ms'] / 1000:.9g}")
+                lines.append(f"{name}_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Forget every sample"""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
@@ -0,0 +1,181 @@
+"""
+Streaming Crossover Strategy
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Live-trading version of the moving average crossover strategy. Prices are
+fed in one bar at a time and every update costs O(1); the trading rules are
+the same as in backtest_strategy, so a stream replayed over historical data
+produces exactly the same trades as the batch backtest. Closed trades are
+kept in a TradeLog, with the same columns (commission included) as the
+batch engines.
+"""
+
+import math
+from indicators import RollingSMA, RollingEMA
+from trade_log import TradeLog
+from costs import CostModel
+
+
+class StreamingCrossoverStrategy:
+    """Moving average crossover strategy that processes one price at a time"""
+
+    def __init__(self, short_period=10, long_period=30, initial_capital=10000,
+                 stop_loss_percent=5, use_ema=False, cost_model=None):
+        ma_class = RollingEMA if use_ema else RollingSMA
+        self.short_ma = ma_class(short_period)
+        self.long_ma = ma_class(long_period)
+        self.short_period = short_period
+        self.long_period = long_period
+        self.stop_loss_percent = stop_loss_percent
+        self.cost_model = cost_model or CostModel()
+
+        # Account state
+        self.capital = initial_capital
+        self.shares = 0
+        self.in_position = False
+        self.entry_price = 0
+        self.entry_day = 0
+        self.stop_loss_price = 0
+        self.entry_commission = 0
+        self.commission_paid = 0
+        self.slippage_cost = 0
+        self.trades = TradeLog()
+
+        # Bar state: MA values for the latest bar and the one before it
+        self.day = -1
+        self.current_mas = (None, None)
+        self.previous_mas = (None, None)
+
+    def update(self, price, volume=None):
+        """
+        Process the next price.
+
+        Signals seen on the previous bar are executed at this price, just as
+        backtest_strategy executes at next_day_price.
+
+        Args:
+            price: The newest price
+            volume: Optional volume of the bar, for the cost model's participation cap
+
+        Returns:
+            List of events ("buy" / "sell" dictionaries) executed at this price
+        """
+        events = self._execute_signals(price, volume)
+
+        # Advance to the new bar
+        self.day += 1
+        self.previous_mas = self.current_mas
+        self.current_mas = (self.short_ma.update(price), self.long_ma.update(price))
+
+        return events
+
+    def portfolio_value(self, price):
+        """Current portfolio value at the given price"""
+        return self.capital + (self.shares * price if self.in_position else 0)
+
+    def _execute_signals(self, next_day_price, volume):
+        signal_day = self.day
+        start_day = max(self.short_period, self.long_period) - 1
+
+        # Crossovers need both MAs for the signal bar and the bar before it
+        if signal_day < start_day or signal_day <= self.long_period - 1:
+            return []
+
+        short_ma_current, long_ma_current = self.current_mas
+        short_ma_prev, long_ma_prev = self.previous_mas
+
+        buy_signal = short_ma_prev <= long_ma_prev and short_ma_current > long_ma_current
+        sell_signal = short_ma_prev >= long_ma_prev and short_ma_current < long_ma_current
+
+        costs = self.cost_model
+        if buy_signal and not self.in_position:
+            # Shares we can buy after slippage and commission
+            fill_price = next_day_price * costs.buy_factor
+            shares = math.floor((self.capital - costs.commission) / (fill_price * (1 + costs.commission_rate)))
+            if volume is not None and costs.max_participation_percent is not None:
+                shares = min(shares, math.floor(volume * (costs.max_participation_percent / 100)))
+            if shares <= 0:
+                return []
+
+            self.shares = shares
+            self.entry_price = fill_price
+            self.entry_commission = costs.commission + shares * fill_price * costs.commission_rate
+            self.capital -= shares * fill_price + self.entry_commission
+            self.commission_paid += self.entry_commission
+            self.slippage_cost += shares * (fill_price - next_day_price)
+            self.in_position = True
+            self.entry_day = signal_day + 1
+            self.stop_loss_price = next_day_price * (1 - self.stop_loss_percent / 100)
+
+            return [{"type": "buy", "day": self.entry_day, "price": fill_price, "shares": shares,
+                     "commission": self.entry_commission}]
+
+        if (sell_signal or next_day_price <= self.stop_loss_price) and self.in_position:
+            exit_price = next_day_price * costs.sell_factor
+            exit_commission = costs.commission + self.shares * exit_price * costs.commission_rate
+            self.capital += self.shares * exit_price - exit_commission
+            self.commission_paid += exit_commission
+            self.slippage_cost += self.shares * (next_day_price - exit_price)
+
+            exit_day = signal_day + 1
+            self.trades.append(self.entry_day, self.entry_price, exit_day, exit_price, self.shares,
+                               "Stop Loss" if next_day_price <= self.stop_loss_price else "Sell Signal",
+                               commission=self.entry_commission + exit_commission)
+            trade_info = self.trades[-1]
+
+            # Reset position tracking
+            self.shares = 0
+            self.in_position = False
+            self.entry_price = 0
+            self.entry_commission = 0
+            self.stop_loss_price = 0
+
+            return [{"type": "sell", "day": exit_day, "price": exit_price,
+                     "shares": trade_info["shares"], "reason": trade_info["exit_reason"],
+                     "commission": exit_commission, "trade": trade_info}]
+
+        return []
+
+
+# Parity check: a replayed stream against the batch backtest, bar by bar
+if __name__ == "__main__":
+    import time
+    import numpy as np
+    from app import backtest_strategy, generate_price_data
+
+    for seed in range(20):
+        prices = generate_price_data(days=1500, volatility=0.02, seed=seed)
+        volume = np.random.default_rng(seed).uniform(20, 200, len(prices))
+        for use_ema in (False, True):
+            for cost_model in (None, CostModel(commission=1, commission_percent=0.1, slippage_bps=5,
+                                               max_participation_percent=50)):
+                expected = backtest_strategy(prices, use_ema=use_ema, cost_model=cost_model, volume=volume)
+
+                strategy = StreamingCrossoverStrategy(use_ema=use_ema, cost_model=cost_model)
+                equity, positions = [], []
+                for price, bar_volume in zip(prices, volume.tolist()):
+                    strategy.update(price, bar_volume)
+                    equity.append(strategy.portfolio_value(price))
+                    positions.append(1 if strategy.in_position else 0)
+
+                # The batch engine values bars start_day..n-2 and records the position after each bar's fills
+                start_day = max(strategy.short_period, strategy.long_period) - 1
+                assert np.allclose(equity[start_day:-1], expected["portfolio_history"][1:])
+                assert positions[start_day + 1:] == list(expected["positions"][1:])
+                assert strategy.trades.to_dicts() == expected["trade_history"].to_dicts()
+                assert math.isclose(strategy.commission_paid, expected["commission_paid"], abs_tol=1e-9)
+                assert math.isclose(strategy.slippage_cost, expected["slippage_cost"], abs_tol=1e-9)
+
+    num_bars = 1_000_000
+    prices = generate_price_data(days=num_bars, volatility=0.02, seed=3)
+    strategy = StreamingCrossoverStrategy()
+    update = strategy.update
+    started = time.perf_counter()
+    for price in prices:
+        update(price)
+    elapsed = time.perf_counter() - started
+
+    print("streaming equity, positions, trades and costs match backtest_strategy bar by bar")
+    print(f"{num_bars:,} updates in {elapsed * 1000:.0f} ms ({num_bars / elapsed:,.0f} bars/sec, "
+          f"{len(strategy.trades):,} trades)")
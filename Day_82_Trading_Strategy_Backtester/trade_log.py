@@ -0,0 +1,242 @@
+"""
+Compact Trade Log
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Stores closed trades in a preallocated structured NumPy array instead of one
+dictionary per trade. Exit reasons are small integer codes, profit/loss and
+duration are derived from the stored columns on demand, and the trade
+metrics are computed with vectorized reductions. Dictionaries are only built
+when results leave the backtester (API responses, tables).
+"""
+
+import numpy as np
+
+# Exit reasons known to every log; other reasons get codes as they appear
+EXIT_REASONS = ("Sell Signal", "Stop Loss")
+
+# One record per closed trade (symbol is -1 for single-instrument backtests;
+# commission is the total paid on entry and exit)
+TRADE_DTYPE = np.dtype([
+    ("entry_day", "<i8"),
+    ("entry_price", "<f8"),
+    ("exit_day", "<i8"),
+    ("exit_price", "<f8"),
+    ("shares", "<i8"),
+    ("commission", "<f8"),
+    ("exit_reason", "u1"),
+    ("symbol", "<i4")
+])
+
+
+# Function to compute the summary metrics from trade profits and losses
+def summarize_trades(profit_loss):
+    """
+    Compute win/loss statistics with vectorized reductions.
+
+    Args:
+        profit_loss: Array of profit/loss amounts, one per closed trade
+
+    Returns:
+        Dictionary with winning trade count, win rate, average win/loss and profit factor
+    """
+    profit_loss = np.asarray(profit_loss, dtype=np.float64)
+    wins = profit_loss[profit_loss > 0]
+    losses = profit_loss[profit_loss < 0]
+
+    gross_profit = float(wins.sum()) if wins.size else 0
+    gross_loss = abs(float(losses.sum())) if losses.size else 0
+
+    return {
+        "winning_trades": int(wins.size),
+        "win_rate_percent": wins.size / profit_loss.size * 100 if profit_loss.size else 0,
+        "avg_win": gross_profit / wins.size if wins.size else 0,
+        "avg_loss": -gross_loss / losses.size if losses.size else 0,
+        "profit_factor": gross_profit / gross_loss if gross_loss > 0 else float('inf')
+    }
+
+
+class TradeLog:
+    """Growable structured array of closed trades"""
+
+    __slots__ = ("_records", "_count", "reasons", "_reason_codes", "symbols")
+
+    def __init__(self, capacity=64, symbols=None):
+        self._records = np.empty(max(capacity, 1), dtype=TRADE_DTYPE)
+        self._count = 0
+        self.reasons = list(EXIT_REASONS)
+        self._reason_codes = {reason: code for code, reason in enumerate(EXIT_REASONS)}
+        self.symbols = symbols  # Optional names for the symbol column
+
+    def append(self, entry_day, entry_price, exit_day, exit_price, shares, exit_reason, symbol=-1,
+               commission=0.0):
+        """
+        Record a closed trade.
+
+        Args:
+            entry_day: Bar the position was opened
+            entry_price: Entry price
+            exit_day: Bar the position was closed
+            exit_price: Exit price
+            shares: Number of shares
+            exit_reason: Exit reason string (e.g. "Sell Signal" or "Stop Loss")
+            symbol: Column index of the symbol in multi-symbol backtests
+            commission: Commission paid on entry and exit
+        """
+        if self._count == len(self._records):
+            self._grow(2 * len(self._records))
+
+        code = self._reason_codes.get(exit_reason)
+        if code is None:
+            code = self._reason_codes[exit_reason] = len(self.reasons)
+            self.reasons.append(exit_reason)
+
+        self._records[self._count] = (entry_day, entry_price, exit_day, exit_price, shares, commission,
+                                      code, symbol)
+        self._count += 1
+
+    def extend(self, other, day_offset=0):
+        """
+        Append every trade of another log, shifting its bars by day_offset.
+
+        Args:
+            other: TradeLog to copy trades from
+            day_offset: Number of bars to add to the entry and exit days
+        """
+        records = other.records.copy()
+        records["entry_day"] += day_offset
+        records["exit_day"] += day_offset
+
+        # Translate the other log's reason codes into this log's codes
+        for code, reason in enumerate(other.reasons):
+            if reason not in self._reason_codes:
+                self._reason_codes[reason] = len(self.reasons)
+                self.reasons.append(reason)
+            records["exit_reason"][other.records["exit_reason"] == code] = self._reason_codes[reason]
+
+        needed = self._count + len(records)
+        if needed > len(self._records):
+            self._grow(max(needed, 2 * len(self._records)))
+        self._records[self._count:needed] = records
+        self._count = needed
+
+    def _grow(self, capacity):
+        records = np.empty(capacity, dtype=TRADE_DTYPE)
+        records[:self._count] = self._records[:self._count]
+        self._records = records
+
+    @property
+    def records(self):
+        """Structured array view of the recorded trades"""
+        return self._records[:self._count]
+
+    @property
+    def entry_day(self):
+        return self.records["entry_day"]
+
+    @property
+    def exit_day(self):
+        return self.records["exit_day"]
+
+    @property
+    def entry_price(self):
+        return self.records["entry_price"]
+
+    @property
+    def exit_price(self):
+        return self.records["exit_price"]
+
+    @property
+    def shares(self):
+        return self.records["shares"]
+
+    @property
+    def commission(self):
+        return self.records["commission"]
+
+    @property
+    def exit_reason(self):
+        """Exit reason codes (index into self.reasons)"""
+        return self.records["exit_reason"]
+
+    @property
+    def profit_loss(self):
+        """Profit/loss after commission"""
+        records = self.records
+        return (records["exit_price"] - records["entry_price"]) * records["shares"] - records["commission"]
+
+    @property
+    def profit_loss_percent(self):
+        """Return on the entry value, after commission"""
+        records = self.records
+        entry_value = records["entry_price"] * records["shares"]
+        return (records["exit_price"] / records["entry_price"] - 1) * 100 - records["commission"] / entry_value * 100
+
+    @property
+    def duration(self):
+        return self.records["exit_day"] - self.records["entry_day"]
+
+    def summary(self):
+        """Win/loss statistics computed with vectorized reductions (see summarize_trades)"""
+        return summarize_trades(self.profit_loss)
+
+    def to_dicts(self):
+        """
+        Build one dictionary per trade (the format returned by backtest_strategy
+        before trades were stored as arrays).
+
+        Returns:
+            List of trade dictionaries
+        """
+        columns = {
+            "entry_day": self.entry_day.tolist(),
+            "entry_price": self.entry_price.tolist(),
+            "exit_day": self.exit_day.tolist(),
+            "exit_price": self.exit_price.tolist(),
+            "shares": self.shares.tolist(),
+            "commission": self.commission.tolist(),
+            "profit_loss": self.profit_loss.tolist(),
+            "profit_loss_percent": self.profit_loss_percent.tolist(),
+            "duration": self.duration.tolist(),
+            "exit_reason": [self.reasons[code] for code in self.exit_reason.tolist()]
+        }
+        if self.symbols is not None:
+            columns["symbol"] = [self.symbols[index] for index in self.records["symbol"].tolist()]
+
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_dicts()[index]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("trade index out of range")
+
+        record = self._records[index]
+        entry_price = float(record["entry_price"])
+        exit_price = float(record["exit_price"])
+        shares = int(record["shares"])
+        commission = float(record["commission"])
+        trade = {
+            "entry_day": int(record["entry_day"]),
+            "entry_price": entry_price,
+            "exit_day": int(record["exit_day"]),
+            "exit_price": exit_price,
+            "shares": shares,
+            "commission": commission,
+            "profit_loss": (exit_price - entry_price) * shares - commission,
+            "profit_loss_percent": (exit_price / entry_price - 1) * 100 - commission / (entry_price * shares) * 100,
+            "duration": int(record["exit_day"] - record["entry_day"]),
+            "exit_reason": self.reasons[record["exit_reason"]]
+        }
+        if self.symbols is not None:
+            trade["symbol"] = self.symbols[record["symbol"]]
+        return trade
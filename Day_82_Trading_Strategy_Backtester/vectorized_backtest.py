@@ -0,0 +1,287 @@
+"""
+Vectorized Backtest Engine
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+NumPy implementation of the moving average crossover backtest. Signals, equity,
+positions and drawdowns are computed as array operations; Python only iterates
+once per trade (not once per bar) to resolve the path-dependent entries, exits
+and stop losses.
+"""
+
+import math
+from bisect import bisect_left
+import numpy as np
+from trade_log import TradeLog
+from costs import CostModel, cost_metrics
+
+# Exit reason of positions closed because the data (or a walk-forward window) ends
+END_OF_DATA = "End of Data"
+
+# Function to convert a list of prices or MA values into a float array
+def to_float_array(values):
+    """
+    Convert prices or moving average values to a float64 NumPy array.
+
+    Args:
+        values: List or array of values (None entries become NaN)
+
+    Returns:
+        NumPy float64 array
+    """
+    if isinstance(values, np.ndarray) and values.dtype == np.float64:
+        return values
+    return np.array(values, dtype=np.float64)
+
+# Function to find crossover signals for every bar at once
+def crossover_signals(short_ma, long_ma, first_day, last_day):
+    """
+    Find buy and sell crossover signals for all bars at once.
+
+    Args:
+        short_ma: Array of short-term moving average values (bars first; 2-D
+                  arrays give signals for every column)
+        long_ma: Array of long-term moving average values
+        first_day: First bar on which a crossover can be detected
+        last_day: Bar at which signal detection stops (exclusive)
+
+    Returns:
+        Tuple of boolean arrays (buy_signals, sell_signals)
+    """
+    buy_signals = np.zeros(short_ma.shape, dtype=bool)
+    sell_signals = np.zeros(short_ma.shape, dtype=bool)
+
+    if first_day < last_day:
+        short_prev = short_ma[first_day - 1:last_day - 1]
+        long_prev = long_ma[first_day - 1:last_day - 1]
+        short_current = short_ma[first_day:last_day]
+        long_current = long_ma[first_day:last_day]
+
+        # Short MA crosses above / below long MA
+        buy_signals[first_day:last_day] = (short_prev <= long_prev) & (short_current > long_current)
+        sell_signals[first_day:last_day] = (short_prev >= long_prev) & (short_current < long_current)
+
+    return buy_signals, sell_signals
+
+# Main vectorized backtesting function
+def backtest_vectorized(prices, short_ma, long_ma, short_period=10, long_period=30,
+                        initial_capital=10000, stop_loss_percent=5, cost_model=None, volume=None,
+                        close_at_end=False):
+    """
+    Backtest a moving average crossover strategy using NumPy array operations.
+
+    Produces the same results as the day-by-day loop in backtest_strategy:
+    trades are entered and exited at the next bar's price and the stop loss
+    is checked against the next bar's price. With a cost model, fills are
+    moved by the slippage, commission is deducted from the cash and entries
+    are sized so the commission is covered.
+
+    Args:
+        prices: List or array of historical prices
+        short_ma: Short-term moving average values (None/NaN before it is established)
+        long_ma: Long-term moving average values (None/NaN before it is established)
+        short_period: Period of the short-term moving average
+        long_period: Period of the long-term moving average
+        initial_capital: Starting capital amount
+        stop_loss_percent: Percentage of entry price for stop loss
+        cost_model: Optional CostModel (no costs by default)
+        volume: Optional bar volumes for the cost model's participation cap
+        close_at_end: Sell a position still open at the end at the last price,
+                      with slippage and commission, and record the trade
+                      (backtest_strategy only values it at the last price)
+
+    Returns:
+        Dictionary containing performance metrics (history series are NumPy
+        arrays and trade_history is a TradeLog)
+    """
+    prices = to_float_array(prices)
+    short_ma = to_float_array(short_ma)
+    long_ma = to_float_array(long_ma)
+    num_bars = len(prices)
+
+    # Trading starts once both MAs exist; the last bar is kept for execution
+    start_day = max(short_period, long_period) - 1
+    last_day = num_bars - 1
+    first_signal_day = max(start_day, long_period)
+
+    buy_signals, sell_signals = crossover_signals(short_ma, long_ma, first_signal_day, last_day)
+    buy_days = np.flatnonzero(buy_signals).tolist()
+    sell_days = np.flatnonzero(sell_signals).tolist()
+    next_prices = prices[1:]  # next_prices[day] is the execution price for a signal on day
+
+    # Cost model parameters as plain numbers for the trade loop
+    cost_model = cost_model or CostModel()
+    buy_factor = cost_model.buy_factor
+    sell_factor = cost_model.sell_factor
+    commission = cost_model.commission
+    commission_rate = cost_model.commission_rate
+    share_limits = cost_model.share_limits(volume)
+    commission_paid = 0.0
+    slippage_cost = 0.0
+
+    # Walk the trades (not the bars) to resolve entries, exits and stop losses
+    capital = initial_capital
+    trades = TradeLog()
+    change_days = [0]  # Bars from which a new capital/share level applies
+    capital_levels = [capital]
+    share_levels = [0]
+    search_day = first_signal_day
+
+    while True:
+        index = bisect_left(buy_days, search_day)
+        if index >= len(buy_days):
+            break
+        signal_day = buy_days[index]
+        if close_at_end and signal_day + 1 >= last_day:
+            break  # A position entered on the last bar would be closed right away
+
+        market_price = float(next_prices[signal_day])
+        entry_price = market_price * buy_factor
+        shares = math.floor((capital - commission) / (entry_price * (1 + commission_rate)))
+        if share_limits is not None:
+            shares = min(shares, int(share_limits[signal_day + 1]))
+        if shares <= 0:
+            search_day = signal_day + 1
+            continue
+
+        entry_commission = commission + shares * entry_price * commission_rate
+        capital -= shares * entry_price + entry_commission
+        commission_paid += entry_commission
+        slippage_cost += shares * (entry_price - market_price)
+        stop_loss_price = market_price * (1 - stop_loss_percent / 100)
+        entry_day = signal_day + 1
+        change_days.append(entry_day)
+        capital_levels.append(capital)
+        share_levels.append(shares)
+
+        # Exit on the first stop loss hit before the next sell signal, otherwise on the sell signal
+        index = bisect_left(sell_days, entry_day)
+        next_sell_day = sell_days[index] if index < len(sell_days) else last_day
+        stop_hits = next_prices[entry_day:next_sell_day] <= stop_loss_price
+
+        exit_reason = None
+        if stop_hits.any():
+            exit_signal_day = entry_day + int(np.argmax(stop_hits))
+        elif next_sell_day < last_day:
+            exit_signal_day = next_sell_day
+        elif close_at_end:
+            exit_signal_day = last_day - 1  # Sell at the last bar's price
+            exit_reason = END_OF_DATA
+        else:
+            break  # Position is still open at the end of the data
+
+        market_price = float(next_prices[exit_signal_day])
+        exit_price = market_price * sell_factor
+        exit_commission = commission + shares * exit_price * commission_rate
+        capital += shares * exit_price - exit_commission
+        commission_paid += exit_commission
+        slippage_cost += shares * (market_price - exit_price)
+        exit_day = exit_signal_day + 1
+        change_days.append(exit_day)
+        capital_levels.append(capital)
+        share_levels.append(0)
+
+        trades.append(entry_day, entry_price, exit_day, exit_price, shares,
+                      exit_reason or ("Stop Loss" if market_price <= stop_loss_price else "Sell Signal"),
+                      commission=entry_commission + exit_commission)
+
+        search_day = exit_day
+
+    # Expand the capital/share levels to one value per simulated bar
+    days = np.arange(start_day, last_day)
+    level_index = np.searchsorted(change_days, days, side='right') - 1
+    capital_levels = np.array(capital_levels, dtype=np.float64)
+    share_levels = np.array(share_levels, dtype=np.float64)
+
+    held_shares = share_levels[level_index]
+    portfolio_values = capital_levels[level_index] + held_shares * prices[start_day:last_day]
+
+    # Positions are recorded after each bar's trading decision
+    after_index = np.searchsorted(change_days, days + 1, side='right') - 1
+    positions = (share_levels[after_index] > 0).astype(np.int64)
+
+    # Running peak (starting from initial capital) and drawdown
+    peaks = np.maximum.accumulate(np.concatenate(([initial_capital], portfolio_values)))[1:]
+    drawdowns = (peaks - portfolio_values) / peaks * 100
+    max_drawdown = max(0, float(drawdowns.max())) if drawdowns.size else 0
+
+    # Calculate final portfolio value
+    final_portfolio_value = capital
+    if share_levels[-1] > 0:
+        final_portfolio_value += share_levels[-1] * prices[-1]
+    final_portfolio_value = float(final_portfolio_value)
+
+    # Calculate performance metrics
+    total_return = (final_portfolio_value / initial_capital - 1) * 100
+    trade_stats = trades.summary()
+
+    years = num_bars / 252  # Standard trading days in a year
+    annualized_return = ((final_portfolio_value / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0
+
+    return {
+        "initial_capital": initial_capital,
+        "final_portfolio_value": final_portfolio_value,
+        "total_return_percent": total_return,
+        "annualized_return_percent": annualized_return,
+        "total_trades": len(trades),
+        "winning_trades": trade_stats["winning_trades"],
+        "losing_trades": len(trades) - trade_stats["winning_trades"],
+        "win_rate_percent": trade_stats["win_rate_percent"],
+        "avg_win": trade_stats["avg_win"],
+        "avg_loss": trade_stats["avg_loss"],
+        "profit_factor": trade_stats["profit_factor"],
+        "max_drawdown_percent": max_drawdown,
+        "trade_history": trades,
+        "portfolio_history": np.concatenate(([initial_capital], portfolio_values)),
+        "positions": np.concatenate(([0], positions)),
+        "drawdowns": np.concatenate(([0.0], drawdowns)),
+        **cost_metrics(commission_paid, slippage_cost, initial_capital)
+    }
+
+
+# Parity check against the day-by-day loop and benchmark of both engines
+if __name__ == "__main__":
+    import time
+    from app import backtest_strategy, generate_price_data
+    from indicators import sma_array, ema_array
+
+    # Same trades, equity, positions and costs as the loop, for SMA/EMA, with and without costs
+    for seed in range(20):
+        prices = generate_price_data(days=1500, volatility=0.02, seed=seed)
+        volume = np.random.default_rng(seed).uniform(20, 200, len(prices))
+        for use_ema in (False, True):
+            ma_array = ema_array if use_ema else sma_array
+            short_ma, long_ma = ma_array(prices, 10), ma_array(prices, 30)
+            for cost_model in (None, CostModel(commission=1, commission_percent=0.1, slippage_bps=5,
+                                               max_participation_percent=50)):
+                expected = backtest_strategy(prices, use_ema=use_ema, cost_model=cost_model, volume=volume)
+                result = backtest_vectorized(prices, short_ma, long_ma, 10, 30,
+                                             cost_model=cost_model, volume=volume)
+                trades, expected_trades = result["trade_history"], expected["trade_history"]
+                assert len(trades) == len(expected_trades)
+                for column in ("entry_day", "exit_day", "shares", "exit_reason"):
+                    assert np.array_equal(getattr(trades, column), getattr(expected_trades, column))
+                for column in ("entry_price", "exit_price", "commission"):
+                    assert np.allclose(getattr(trades, column), getattr(expected_trades, column))
+                assert np.array_equal(result["positions"], expected["positions"])
+                assert np.allclose(result["portfolio_history"], expected["portfolio_history"])
+                assert np.allclose(result["drawdowns"], expected["drawdowns"])
+                for key in ("final_portfolio_value", "max_drawdown_percent", "commission_paid", "slippage_cost"):
+                    assert math.isclose(result[key], expected[key], rel_tol=1e-9, abs_tol=1e-9), key
+
+    print("vectorized engine matches backtest_strategy (SMA/EMA, with and without costs)")
+    for num_bars in (10_000, 100_000, 1_000_000):
+        prices = generate_price_data(days=num_bars, volatility=0.02, seed=3)
+        price_array = np.array(prices)
+
+        started = time.perf_counter()
+        expected = backtest_strategy(prices)
+        loop = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = backtest_vectorized(price_array, sma_array(price_array, 10), sma_array(price_array, 30))
+        vectorized = time.perf_counter() - started
+        assert len(result["trade_history"]) == len(expected["trade_history"])
+
+        print(f"{num_bars:>9,} bars: loop {loop * 1000:8.1f} ms, vectorized {vectorized * 1000:7.1f} ms "
+              f"({loop / vectorized:5.1f}x, {len(result['trade_history']):,} trades)")
@@ -0,0 +1,204 @@
+"""
+Walk-Forward Optimization
+From the book: Practical Python for Effective Algorithmic Trading
+Available at: https://www.amazon.com/dp/B0F3S8FQ7C
+
+Slides a train window over the price series, picks the best parameters on
+each train window and trades them on the test window that follows. Only the
+out-of-sample test results are stitched together, which gives a far more
+honest picture than a single backtest optimised over the whole series.
+"""
+
+from itertools import product
+import numpy as np
+from indicators import IndicatorStore
+from optimizer import expand_range, run_backtests, run_config, rank_results, MAX_GRID_SIZE
+from trade_log import TradeLog
+from costs import cost_metrics
+
+
+# Function to split a series into train/test windows
+def make_windows(num_bars, train_bars, test_bars, anchored=False):
+    """
+    Split a series into consecutive train/test windows.
+
+    Test windows follow each other without gaps; the last one may be shorter.
+
+    Args:
+        num_bars: Length of the price series
+        train_bars: Bars in each train window
+        test_bars: Bars in each test window
+        anchored: Grow the train window from the first bar instead of sliding it
+
+    Returns:
+        List of (train_start, train_end, test_start, test_end) tuples (ends exclusive)
+    """
+    windows = []
+    test_start = train_bars
+    while test_start < num_bars - 1:  # A test window needs at least two bars
+        test_end = min(test_start + test_bars, num_bars)
+        train_start = 0 if anchored else test_start - train_bars
+        windows.append((train_start, test_start, test_start, test_end))
+        test_start = test_end
+    return windows
+
+# Function to build the config that trades a window
+def window_config(params, start, end, initial_capital):
+    """
+    Backtest config for one window.
+
+    The slice starts early by the longest MA period so the strategy can trade
+    from the first bar of the window; the MAs come from the full series, so
+    the extra bars only serve as warm-up.
+    """
+    warmup = max(params["short_period"], params["long_period"])
+    return dict(params, start=max(start - warmup, 0), end=end, initial_capital=initial_capital)
+
+# Main walk-forward function
+def walk_forward(prices, train_bars, test_bars, short_periods, long_periods, stop_losses=(5,),
+                 ma_types=("sma",), initial_capital=10000, sort_by="total_return_percent",
+                 anchored=False, max_workers=1, cost_model=None, volume=None, progress=None):
+    """
+    Run a walk-forward optimization of the crossover strategy.
+
+    Every parameter combination is backtested on every train window (these
+    runs are independent and can be spread over worker processes). The best
+    combination of each train window is then traded on its test window, with
+    the capital carried over from the previous test window. A position still
+    open at the end of a test window is sold at its last price, with the
+    cost model's slippage and commission, and recorded as an "End of Data"
+    trade, so the next window starts in cash without a free exit.
+
+    Args:
+        prices: List or array of historical prices
+        train_bars: Bars in each train window
+        test_bars: Bars in each test window
+        short_periods: Short MA periods to test (value, list or range dict)
+        long_periods: Long MA periods to test (value, list or range dict)
+        stop_losses: Stop loss percentages to test (value, list or range dict)
+        ma_types: MA types to test ('sma' and/or 'ema')
+        initial_capital: Starting capital amount
+        sort_by: Metric used to pick the best combination on each train window
+        anchored: Grow the train window from the first bar instead of sliding it
+        max_workers: Number of processes to spread the train runs over
+        cost_model: Optional CostModel applied to train and test runs
+        volume: Optional bar volumes for the cost model's participation cap
+        progress: Optional progress(done, total) callback, counting train and
+                  test runs; an exception raised by it stops the run
+
+    Returns:
+        Dictionary with the stitched out-of-sample metrics (backtest_strategy
+        schema, trade days relative to the full series) and a "windows" list
+        of the parameters picked for each window with their train and test results
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    short_periods = [int(p) for p in expand_range(short_periods)]
+    long_periods = [int(p) for p in expand_range(long_periods)]
+    stop_losses = [float(s) for s in expand_range(stop_losses)]
+    ma_types = expand_range(ma_types)
+
+    grid = [{"ma_type": ma_type, "short_period": short_period, "long_period": long_period,
+             "stop_loss": stop_loss}
+            for ma_type, short_period, long_period, stop_loss
+            in product(ma_types, short_periods, long_periods, stop_losses)
+            if short_period < long_period < train_bars]
+    if not grid:
+        raise ValueError("No parameter combinations fit in the train window")
+
+    windows = make_windows(len(prices), train_bars, test_bars, anchored)
+    if not windows:
+        raise ValueError("Series is too short for a single train/test window")
+    if len(grid) * len(windows) > MAX_GRID_SIZE * 10:
+        raise ValueError(f"{len(grid)} combinations x {len(windows)} windows is too many backtests")
+
+    # Moving averages are calculated once over the full series and sliced per window
+    indicators = IndicatorStore(prices)
+
+    # Train runs for every window and combination in one batch
+    train_configs = [dict(window_config(params, train_start, train_end, initial_capital), cost_model=cost_model)
+                     for train_start, train_end, _, _ in windows for params in grid]
+    total_runs = len(train_configs) + len(windows)
+    train_progress = None
+    if progress is not None:
+        train_progress = lambda done, total: progress(done, total_runs)
+    train_results = run_backtests(prices, train_configs, max_workers, indicators=indicators, volume=volume,
+                                  progress=train_progress)
+
+    capital = initial_capital
+    equity = []
+    trades = TradeLog()
+    commission_paid = 0
+    slippage_cost = 0
+    window_rows = []
+
+    for number, (train_start, train_end, test_start, test_end) in enumerate(windows):
+        # Pick the best combination on the train window
+        offset = number * len(grid)
+        rows = [dict(params, **results) for params, results
+                in zip(grid, train_results[offset:offset + len(grid)])]
+        best = rank_results(rows, sort_by)[0]
+        params = {key: best[key] for key in ("ma_type", "short_period", "long_period", "stop_loss")}
+
+        # Trade it out of sample with the capital carried over, closing out at the window's end
+        config = dict(window_config(params, test_start, test_end, capital), cost_model=cost_model,
+                      close_at_end=True)
+        results = run_config(indicators, config, keep_history=True, volume=volume)
+        commission_paid += results["commission_paid"]
+        slippage_cost += results["slippage_cost"]
+
+        # History[0] is the starting capital and history[1] the warm-up's last bar
+        equity.extend(results["portfolio_history"][2:].tolist())
+        equity.append(results["final_portfolio_value"])
+
+        trades.extend(results["trade_history"], day_offset=config["start"])
+
+        window_rows.append(dict(
+            params,
+            train_start=train_start,
+            train_end=train_end,
+            test_start=test_start,
+            test_end=test_end,
+            train_return_percent=best["total_return_percent"],
+            train_sort_value=best[sort_by],
+            test_return_percent=results["total_return_percent"],
+            test_max_drawdown_percent=results["max_drawdown_percent"],
+            test_trades=results["total_trades"]
+        ))
+
+        capital = results["final_portfolio_value"]
+        if progress is not None:
+            progress(len(train_configs) + number + 1, total_runs)
+
+    # Stitched out-of-sample equity curve and drawdown
+    portfolio_values = np.array(equity)
+    peaks = np.maximum.accumulate(np.concatenate(([initial_capital], portfolio_values)))[1:]
+    drawdowns = (peaks - portfolio_values) / peaks * 100
+    max_drawdown = max(0, float(drawdowns.max())) if drawdowns.size else 0
+
+    # Calculate performance metrics
+    final_portfolio_value = capital
+    total_return = (final_portfolio_value / initial_capital - 1) * 100
+    trade_stats = trades.summary()
+
+    years = len(portfolio_values) / 252  # Standard trading days in a year
+    annualized_return = ((final_portfolio_value / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0
+
+    return {
+        "initial_capital": initial_capital,
+        "final_portfolio_value": final_portfolio_value,
+        "total_return_percent": total_return,
+        "annualized_return_percent": annualized_return,
+        "total_trades": len(trades),
+        "winning_trades": trade_stats["winning_trades"],
+        "losing_trades": len(trades) - trade_stats["winning_trades"],
+        "win_rate_percent": trade_stats["win_rate_percent"],
+        "avg_win": trade_stats["avg_win"],
+        "avg_loss": trade_stats["avg_loss"],
+        "profit_factor": trade_stats["profit_factor"],
+        "max_drawdown_percent": max_drawdown,
+        "trade_history": trades,
+        "portfolio_history": np.concatenate(([initial_capital], portfolio_values)),
+        "drawdowns": np.concatenate(([0.0], drawdowns)),
+        "windows": window_rows,
+        **cost_metrics(commission_paid, slippage_cost, initial_capital)
+    }